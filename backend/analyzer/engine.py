@@ -0,0 +1,290 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import chain, islice
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from analyzer.python_analyzer import analyze_python_file, ANALYZER_VERSION
+from cache_store import SQLiteCache
+
+# Worker processes used for parsing (defaults to one per CPU)
+ANALYSIS_WORKERS = int(os.environ.get("ANALYSIS_WORKERS", "0")) or os.cpu_count() or 1
+
+# Below this many files, parsing in-process is faster than shipping work to the pool
+PARALLEL_MIN_FILES = int(os.environ.get("PARALLEL_MIN_FILES", "50"))
+
+# Files sent to a worker per IPC round-trip (also the cache lookup batch)
+ANALYSIS_BATCH_SIZE = int(os.environ.get("ANALYSIS_BATCH_SIZE", "32"))
+
+# Error reported for files whose batch killed its worker twice
+WORKER_CRASHED = "analysis worker crashed"
+
+# Persistent cache of per-file analyses keyed by content hash
+ANALYSIS_CACHE_ENABLED = os.environ.get("ANALYSIS_CACHE_ENABLED", "1") == "1"
+ANALYSIS_CACHE_PATH = Path(os.environ.get("ANALYSIS_CACHE_PATH", "./data/analysis_cache.db"))
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.environ.get("ANALYSIS_CACHE_MAX_ENTRIES", "200000"))
+ANALYSIS_CACHE_MAX_MB = int(os.environ.get("ANALYSIS_CACHE_MAX_MB", "512"))
+
+# File suffix → analyzer
+ANALYZERS = {
+    '.py': analyze_python_file,
+}
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+_cache: Optional[SQLiteCache] = None
+_cache_lock = threading.Lock()
+
+
+def analyze_file(file_path: Path) -> dict:
+    """Analyze a single file"""
+    analyzer = ANALYZERS.get(file_path.suffix)
+    if analyzer:
+        return analyzer(file_path)
+    # Add more analyzers as needed
+    return None
+
+
+def analyze_files(
+    files: Iterable[Path],
+    max_workers: int = None,
+    on_progress: Optional[Callable[[int], None]] = None
+) -> List[Dict]:
+    """
+    Analyze files, reusing cached analyses of unchanged content and fanning
+    the rest out over a process pool for larger projects.
+    `files` may be a lazy iterator: batches are dispatched as they arrive, so
+    parsing overlaps with the directory walk.
+    `on_progress(done)` is called with the running count of processed files
+    as batches finish (possibly from a pool callback thread).
+    Returns: analyses in the same order as `files` (unsupported/unparsable files dropped)
+    """
+
+    workers = max_workers or ANALYSIS_WORKERS
+    progress = _ProgressCounter(on_progress)
+    files = (file_path for file_path in files if file_path.suffix in ANALYZERS)
+
+    # Peek far enough to know whether the project is big enough to parallelize
+    head = list(islice(files, PARALLEL_MIN_FILES))
+    pool = _get_pool(workers) if workers > 1 and len(head) >= PARALLEL_MIN_FILES else None
+
+    cache = get_analysis_cache()
+    pending = []
+    reused = 0
+
+    for batch in _batches(chain(head, files), ANALYSIS_BATCH_SIZE):
+        keys = [_cache_key(file_path) for file_path in batch] if cache else [None] * len(batch)
+        cached = cache.get_many(key for key in keys if key) if cache else {}
+
+        results: List[Optional[dict]] = [None] * len(batch)
+        misses = []
+        for index, (file_path, key) in enumerate(zip(batch, keys)):
+            if key in cached:
+                results[index] = _from_cache(cached[key], file_path)
+            else:
+                misses.append(index)
+        reused += len(batch) - len(misses)
+        progress.add(len(batch) - len(misses))
+
+        miss_paths = [batch[index] for index in misses]
+        if pool and miss_paths:
+            try:
+                work = pool.submit(_analyze_batch, miss_paths)
+            except BrokenProcessPool:
+                # A worker died on an earlier batch; carry on with a fresh pool
+                _reset_pool(pool)
+                pool = _get_pool(workers)
+                work = pool.submit(_analyze_batch, miss_paths)
+            work.add_done_callback(lambda _, count=len(miss_paths): progress.add(count))
+        else:
+            work = _analyze_batch(miss_paths)
+            progress.add(len(miss_paths))
+
+        pending.append((batch, keys, results, misses, work, pool))
+
+    analyzed_data = []
+    for batch, keys, results, misses, work, pool in pending:
+        outcomes = _batch_outcomes(work, pool, [batch[index] for index in misses], workers)
+
+        analyses = []
+        for index, (analysis, error) in zip(misses, outcomes):
+            if error:
+                print(f"⚠️ Skipping {batch[index]}: {error}")
+            results[index] = analysis
+            analyses.append((analysis, error))
+
+        if cache:
+            # A crash says nothing about the file's content: leave it uncached
+            cache.set_many(
+                (keys[index], _to_cache(analysis))
+                for index, (analysis, error) in zip(misses, analyses)
+                if keys[index] and error != WORKER_CRASHED
+            )
+
+        analyzed_data.extend(analysis for analysis in results if analysis)
+
+    if reused:
+        print(f"♻️ Reused {reused} cached analyses")
+
+    return analyzed_data
+
+
+def _batch_outcomes(
+    work,
+    pool: Optional[ProcessPoolExecutor],
+    files: List[Path],
+    workers: int
+) -> List[Tuple[Optional[dict], Optional[str]]]:
+    """
+    Outcomes of a dispatched batch. If a worker died (OOM, a crashing parser)
+    the batch is retried once on a fresh pool; if that dies too, its files
+    are reported as skipped instead of failing the whole analysis.
+    """
+
+    if not isinstance(work, Future):
+        return work
+
+    try:
+        return work.result()
+    except BrokenProcessPool:
+        pass
+
+    _reset_pool(pool)
+    retry_pool = _get_pool(workers)
+    try:
+        return retry_pool.submit(_analyze_batch, files).result()
+    except BrokenProcessPool:
+        _reset_pool(retry_pool)
+        return [(None, WORKER_CRASHED) for _ in files]
+
+
+def get_analysis_cache() -> Optional[SQLiteCache]:
+    """Shared analysis cache, or None when disabled"""
+
+    global _cache
+
+    if not ANALYSIS_CACHE_ENABLED:
+        return None
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = SQLiteCache(
+                ANALYSIS_CACHE_PATH,
+                max_entries=ANALYSIS_CACHE_MAX_ENTRIES,
+                max_bytes=ANALYSIS_CACHE_MAX_MB * 1024 * 1024
+            )
+        return _cache
+
+
+class _ProgressCounter:
+    """Thread-safe running count of processed files, reported to a callback"""
+
+    def __init__(self, callback: Optional[Callable[[int], None]]):
+        self.callback = callback
+        self.done = 0
+        self.lock = threading.Lock()
+
+    def add(self, count: int):
+        if not self.callback or not count:
+            return
+        with self.lock:
+            self.done += count
+            self.callback(self.done)
+
+
+def _analyze_batch(files: List[Path]) -> List[Tuple[Optional[dict], Optional[str]]]:
+    """
+    Analyze a batch of files in order (runs inside a pool worker when parallel)
+    Returns: (analysis, error) per file
+    """
+    return [_analyze_safely(file_path) for file_path in files]
+
+
+def _batches(items: Iterable[Path], size: int) -> Iterator[List[Path]]:
+    """Split an iterable into lists of at most `size` items"""
+    items = iter(items)
+    while batch := list(islice(items, size)):
+        yield batch
+
+
+def _analyze_safely(file_path: Path) -> Tuple[Optional[dict], Optional[str]]:
+    """
+    Analyze a file, treating unreadable files as unsupported. Errors are
+    returned for the parent to report; workers don't write to the console.
+    """
+    try:
+        return analyze_file(file_path), None
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        return None, str(e)
+
+
+def _cache_key(file_path: Path) -> Optional[str]:
+    """Analyzer version + suffix + content hash, or None if unreadable"""
+    try:
+        digest = hashlib.sha256(file_path.read_bytes()).hexdigest()
+    except OSError:
+        return None
+    return f"{ANALYZER_VERSION}:{file_path.suffix}:{digest}"
+
+
+def _to_cache(analysis: Optional[dict]) -> str:
+    """Serialize the content-derived part of an analysis (path/name vary per copy)"""
+    if analysis is None:
+        return "null"
+    return json.dumps({
+        key: value for key, value in analysis.items()
+        if key not in ('file_path', 'file_name')
+    })
+
+
+def _from_cache(value: str, file_path: Path) -> Optional[dict]:
+    """Rebuild an analysis for `file_path` from its cached payload"""
+    payload = json.loads(value)
+    if payload is None:
+        return None
+    return {
+        'file_path': str(file_path),
+        'file_name': file_path.name,
+        **payload
+    }
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Shared process pool, created on first use and reused across jobs"""
+
+    global _pool, _pool_workers
+
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                # Already-submitted work still completes on the old pool
+                _pool.shutdown(wait=False)
+            # Spawned, not forked: forking the threaded server (job threads,
+            # the LLM loop, SQLite connections) can copy locks held mid-use
+            # into the workers and deadlock them
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            _pool_workers = workers
+        return _pool
+
+
+def _reset_pool(broken: ProcessPoolExecutor):
+    """Drop the shared pool after a worker died in it, so later batches and jobs get a fresh one"""
+
+    global _pool
+
+    with _pool_lock:
+        # Another batch may already have replaced it
+        if _pool is not broken:
+            return
+        _pool.shutdown(wait=False)
+        _pool = None
@@ -2,6 +2,10 @@ import ast
 from pathlib import Path
 from typing import Dict, List
 
+# Bump whenever the shape or content of the analysis dict changes, so cached
+# analyses produced by older code are not reused
+ANALYZER_VERSION = "3"
+
 def analyze_python_file(file_path: Path) -> Dict:
     """Extract classes, functions, imports from Python file"""
     
@@ -26,7 +30,8 @@ def analyze_python_file(file_path: Path) -> Dict:
                 'name': node.name,
                 'docstring': ast.get_docstring(node),
                 'methods': [],
-                'line_number': node.lineno
+                'line_number': node.lineno,
+                'end_line': node.end_lineno
             }
             
             for item in node.body:
@@ -34,7 +39,9 @@ def analyze_python_file(file_path: Path) -> Dict:
                     class_info['methods'].append({
                         'name': item.name,
                         'docstring': ast.get_docstring(item),
-                        'args': [arg.arg for arg in item.args.args]
+                        'args': [arg.arg for arg in item.args.args],
+                        'line_number': item.lineno,
+                        'end_line': item.end_lineno
                     })
             
             analysis['classes'].append(class_info)
@@ -47,6 +54,7 @@ def analyze_python_file(file_path: Path) -> Dict:
                     'docstring': ast.get_docstring(node),
                     'args': [arg.arg for arg in node.args.args],
                     'line_number': node.lineno,
+                    'end_line': node.end_lineno,
                     'returns': ast.unparse(node.returns) if node.returns else None
                 }
                 analysis['functions'].append(func_info)
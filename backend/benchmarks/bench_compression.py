@@ -0,0 +1,108 @@
+"""
+Space saved and decode latency of the compressed storage format.
+
+Encodes real analyses of this repository's Python files (the per-file
+JSON columns), a generated documentation document and a KT plan with
+curd.encode_text. Reports stored vs raw size and encode/decode times.
+With --db, it samples rows from an existing database instead.
+
+Usage (from backend/):
+    python benchmarks/bench_compression.py [--db ./data/kt_generator.db] [--repeat 200]
+"""
+
+import argparse
+import json
+import sqlite3
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import curd
+from analyzer.python_analyzer import analyze_python_file
+from walker import walk_project_files
+
+
+def sample_repository():
+    root = Path(__file__).resolve().parent.parent
+    samples = {"files.classes": [], "files.functions": [], "files.imports": []}
+    analyses = []
+    for path in walk_project_files(root):
+        if path.suffix == '.py':
+            analysis = analyze_python_file(path)
+            if analysis:
+                analyses.append(analysis)
+                for column in ("classes", "functions", "imports"):
+                    samples[f"files.{column}"].append(json.dumps(analysis[column]))
+
+    sections = []
+    for analysis in analyses:
+        sections.append(f"### {analysis['file_name']}\n")
+        for item in analysis['classes'] + analysis['functions']:
+            sections.append(f"- **{item['name']}**: {item.get('docstring') or 'No description.'}\n")
+    samples["documentation.content"] = ["# Documentation\n## Key Modules\n" + ''.join(sections)]
+    samples["kt_plans.plan"] = [json.dumps({"plan": [
+        {"day": day, "title": f"Day {day}", "focus": "Study the modules " * 10,
+         "files_to_study": [a['file_name'] for a in analyses[:8]],
+         "concepts": ["async", "sqlite", "caching"], "exercise": "Trace a request " * 5,
+         "checkpoint_questions": ["What does it do?"] * 3}
+        for day in range(1, 11)
+    ]})]
+    return samples
+
+
+def sample_database(path: Path, limit: int):
+    conn = sqlite3.connect(path)
+    samples = {}
+    for table, columns in curd.COMPRESSED_COLUMNS.items():
+        for column in columns:
+            rows = conn.execute(f"SELECT {column} FROM {table} LIMIT ?", (limit,)).fetchall()
+            samples[f"{table}.{column}"] = [curd.decode_text(row[0]) for row in rows if row[0] is not None]
+    conn.close()
+    return samples
+
+
+def measure(name, values, repeat: int):
+    if not values:
+        print(f"  {name:24} (no rows)")
+        return
+    raw = sum(len(value.encode('utf-8')) for value in values)
+    encoded = [curd.encode_text(value) for value in values]
+    stored = sum(len(value if isinstance(value, bytes) else value.encode('utf-8')) for value in encoded)
+    compressed = sum(isinstance(value, bytes) for value in encoded)
+
+    encode_times, decode_times = [], []
+    for _ in range(repeat):
+        for value, packed in zip(values, encoded):
+            start = time.perf_counter()
+            curd.encode_text(value)
+            encode_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            curd.decode_text(packed)
+            decode_times.append(time.perf_counter() - start)
+
+    print(
+        f"  {name:24} {len(values):6} values  {compressed:6} compressed  "
+        f"{raw / 1024:9.1f} KB -> {stored / 1024:9.1f} KB ({raw / max(stored, 1):4.1f}x)  "
+        f"encode {statistics.median(encode_times) * 1e6:7.1f} us  decode {statistics.median(decode_times) * 1e6:7.1f} us"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", type=Path, help="sample rows from this database instead of the repository")
+    parser.add_argument("--limit", type=int, default=2000, help="rows sampled per column with --db")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    samples = sample_database(args.db, args.limit) if args.db else sample_repository()
+
+    print(f"zlib level {curd.DB_COMPRESSION_LEVEL}, values under {curd.DB_COMPRESSION_MIN_BYTES} bytes stored as-is (median per value)")
+    for name, values in samples.items():
+        measure(name, values, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
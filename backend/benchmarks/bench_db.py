@@ -0,0 +1,179 @@
+"""
+Concurrent read/write throughput of the SQLite layer.
+
+Runs the same mixed workload (readers calling get_project / get_files /
+get_user_progress while writers call save_to_db) twice: once with a fresh
+rollback-journal connection per call (the previous behaviour) and once with
+the pooled WAL connections from database.py.
+
+Usage (from backend/):
+    python benchmarks/bench_db.py [--readers 8] [--writers 2] [--seconds 10] [--files 200]
+"""
+
+import argparse
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import curd
+import database
+import http_cache
+
+
+_local = threading.local()
+
+
+@contextmanager
+def per_call_connection():
+    """
+    The old get_db_connection: new connection per call, default journal.
+    Nested calls on a thread (e.g. the cache-version bump inside save_to_db)
+    share the outer call's connection, as they would otherwise wait on
+    their own transaction's lock.
+    """
+    outer = getattr(_local, "conn", None)
+    if outer is not None:
+        yield outer
+        return
+
+    conn = sqlite3.connect(database.DB_PATH)
+    conn.row_factory = sqlite3.Row
+    _local.conn = conn
+    try:
+        yield conn
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise e
+    finally:
+        _local.conn = None
+        conn.close()
+
+
+def use_connections(factory):
+    """Route every store access through `factory` (modules bind get_db_connection on import)"""
+    for module in (database, curd, http_cache):
+        module.get_db_connection = factory
+
+
+def fake_project(files: int):
+    analyzed = [
+        {
+            'file_path': f'pkg{i % 20}/module_{i}.py',
+            'file_name': f'module_{i}.py',
+            'complexity': random.randint(1, 50),
+            'classes': [{'name': f'C{i}', 'docstring': None, 'line_number': 1, 'methods': []}],
+            'functions': [{'name': f'f{i}', 'docstring': None, 'args': ['x'], 'line_number': 10}],
+            'imports': ['os', 'json']
+        }
+        for i in range(files)
+    ]
+    plan = {'plan': [{'day': day, 'title': f'Day {day}'} for day in range(1, 11)]}
+    return analyzed, '# Docs\n## Overview\n' + 'text ' * 2000, plan
+
+
+def run_workload(readers: int, writers: int, seconds: float, files: int):
+    analyzed, documentation, plan = fake_project(files)
+    project_ids = [curd.save_to_db('seed', analyzed, documentation, plan) for _ in range(5)]
+
+    deadline = time.perf_counter() + seconds
+    latencies = {'read': [], 'write': []}
+    errors = []
+    lock = threading.Lock()
+
+    def reader():
+        local = []
+        while time.perf_counter() < deadline:
+            project_id = random.choice(project_ids)
+            start = time.perf_counter()
+            try:
+                curd.get_project(project_id)
+                curd.get_files(project_id)
+                curd.get_user_progress(project_id)
+            except sqlite3.OperationalError as e:
+                errors.append(str(e))
+                continue
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies['read'].extend(local)
+
+    def writer():
+        local = []
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                project_ids.append(curd.save_to_db('bench', analyzed, documentation, plan))
+            except sqlite3.OperationalError as e:
+                errors.append(str(e))
+                continue
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies['write'].extend(local)
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return latencies, errors
+
+
+def report(name: str, latencies, errors, seconds: float):
+    print(f"\n{name}")
+    for kind, values in latencies.items():
+        if not values:
+            print(f"  {kind:5}: no operations completed")
+            continue
+        values.sort()
+        p95 = values[int(len(values) * 0.95) - 1] if len(values) > 1 else values[0]
+        print(
+            f"  {kind:5}: {len(values) / seconds:8.1f} ops/s   "
+            f"median {statistics.median(values) * 1000:7.2f} ms   p95 {p95 * 1000:7.2f} ms"
+        )
+    if errors:
+        print(f"  errors: {len(errors)} (e.g. {errors[0]})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--files", type=int, default=200, help="file rows per saved project")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Per-call connections on a rollback-journal database
+        database.DB_PATH = Path(tmp) / "per_call.db"
+        database.init_database(background=False)
+        database.close_thread_connection()
+        conn = sqlite3.connect(database.DB_PATH)
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.close()
+        pooled = database.get_db_connection
+        use_connections(per_call_connection)
+        report("per-call connections (rollback journal)", *run_workload(
+            args.readers, args.writers, args.seconds, args.files
+        ), args.seconds)
+
+        # Pooled WAL connections
+        use_connections(pooled)
+        database.DB_PATH = Path(tmp) / "pooled.db"
+        database.init_database(background=False)
+        report("pooled connections (WAL)", *run_workload(
+            args.readers, args.writers, args.seconds, args.files
+        ), args.seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Cold-start cost of importing the API server.
+
+Imports `main` in fresh interpreters and reports the median wall time,
+the slowest modules from `python -X importtime` (cumulative microseconds)
+and the peak RSS of the child. Fails (exit code 1) when the median exceeds
+--max-ms or when a module that must stay lazy (chromadb, the embedding
+model, the OpenAI SDK) is imported at startup. Timings depend on the
+machine; the machine-independent regression check is
+checks/check_lazy_imports.py.
+
+Usage (from backend/):
+    python benchmarks/bench_import.py [--runs 5] [--max-ms 1500] [--top 15]
+"""
+
+import argparse
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+# Must only be imported by the requests that use them
+LAZY_MODULES = ("chromadb", "sentence_transformers", "torch", "openai", "httpx")
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def timed_import(module: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], cwd=BACKEND, check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def import_profile(module: str):
+    """(cumulative µs, self µs, depth, name) per module, and the lazy modules that got imported"""
+
+    probe = (
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=BACKEND, capture_output=True, text=True, check=True
+    )
+
+    entries = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((int(cumulative_us), int(self_us), len(indent) // 2, name))
+
+    loaded = [name for name in result.stdout.strip().split(",") if name]
+    return entries, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main", help="module to import (default: the API server)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, help="fail when the median import time exceeds this")
+    parser.add_argument("--top", type=int, default=15, help="slowest modules to list")
+    args = parser.parse_args()
+
+    # First run warms the bytecode cache so runs measure imports, not compiles
+    timed_import(args.module)
+    times = [timed_import(args.module) for _ in range(args.runs)]
+    median = statistics.median(times)
+
+    entries, loaded = import_profile(args.module)
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+
+    print(f"import {args.module}: median {median:.0f} ms over {args.runs} runs "
+          f"(min {min(times):.0f}, max {max(times):.0f}), peak RSS {peak_rss_mb:.0f} MB")
+
+    print(f"\n{'cumulative ms':>14} {'self ms':>8}  module")
+    for cumulative_us, self_us, _, name in sorted(entries, reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>8.1f}  {name}")
+
+    failed = False
+    if loaded:
+        print(f"\n❌ Imported at startup but should be lazy: {', '.join(loaded)}")
+        failed = True
+    if args.max_ms is not None and median > args.max_ms:
+        print(f"\n❌ Median import time {median:.0f} ms exceeds --max-ms {args.max_ms:.0f}")
+        failed = True
+
+    if failed:
+        sys.exit(1)
+    print("\n✅ Startup imports within budget")
+
+
+if __name__ == "__main__":
+    main()
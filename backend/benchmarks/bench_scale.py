@@ -0,0 +1,159 @@
+"""
+Ingest and lookup performance of the SQLite store at scale.
+
+1. Compares per-row INSERTs (the previous insert_files) with the batched
+   executemany path on a sample of projects.
+2. Fills a database with --projects projects of --files file rows each
+   (defaults: 10k projects / 10M file rows) through save_to_db.
+3. Times the per-project lookups the API serves (files, KT plan, progress,
+   documentation outline, symbol search) with the migration indexes, then again after
+   dropping them to show the full-table-scan cost.
+
+The full-scale run writes several GB; use --projects/--files for a quick run.
+
+Usage (from backend/):
+    python benchmarks/bench_scale.py [--projects 10000] [--files 1000] [--db path]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import curd
+import database
+
+
+def fake_files(count: int):
+    return [
+        {
+            'file_path': f'pkg{i % 50}/module_{i}.py',
+            'file_name': f'module_{i}.py',
+            'complexity': i % 40,
+            'classes': [{'name': f'C{i}', 'docstring': 'Handles work', 'line_number': 1,
+                         'methods': [{'name': 'run', 'docstring': None, 'args': ['self'], 'line_number': 2}]}],
+            'functions': [{'name': f'f{i}', 'docstring': None, 'args': ['x'], 'line_number': 9}],
+            'imports': ['os']
+        }
+        for i in range(count)
+    ]
+
+
+def insert_files_per_row(cursor, project_id, analyzed_data):
+    """The previous insert_files: one execute per row"""
+    for file_data in analyzed_data:
+        cursor.execute("""
+            INSERT INTO files (
+                project_id, file_path, file_name,
+                complexity, classes, functions, imports
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (
+            project_id,
+            file_data['file_path'],
+            file_data['file_name'],
+            file_data['complexity'],
+            json.dumps(file_data.get('classes', [])),
+            json.dumps(file_data.get('functions', [])),
+            json.dumps(file_data.get('imports', []))
+        ))
+
+
+def compare_inserts(files, sample_projects: int):
+    print(f"Insert {sample_projects} projects x {len(files)} files")
+    for name, insert in (("per-row execute", insert_files_per_row), ("executemany", curd.insert_files)):
+        start = time.perf_counter()
+        for index in range(sample_projects):
+            with database.get_db_connection() as conn:
+                insert(conn.cursor(), f"{name}-{index}", files)
+        elapsed = time.perf_counter() - start
+        print(f"  {name:16}: {sample_projects * len(files) / elapsed:10.0f} rows/s")
+
+
+def populate(project_count: int, files):
+    plan = {'plan': [{'day': day, 'title': f'Day {day}'} for day in range(1, 11)]}
+    documentation = '# Docs\n## Overview\nintro\n## Key Modules\n' + 'details ' * 500
+
+    project_ids = []
+    start = time.perf_counter()
+    for index in range(project_count):
+        with contextlib.redirect_stdout(io.StringIO()):
+            project_ids.append(curd.save_to_db(f'project-{index}', files, documentation, plan))
+        if (index + 1) % max(project_count // 10, 1) == 0:
+            elapsed = time.perf_counter() - start
+            print(f"  {index + 1} projects, {(index + 1) * len(files)} file rows ({(index + 1) * len(files) / elapsed:.0f} rows/s)")
+    return project_ids
+
+
+def time_lookups(project_ids, lookups: int):
+    queries = {
+        "get_files": curd.get_files,
+        "get_kt_plan": curd.get_kt_plan,
+        "get_user_progress": curd.get_user_progress,
+        "get_documentation_outline": curd.get_documentation_outline,
+        "search_symbols": lambda project_id: curd.search_symbols(project_id, "f12"),
+    }
+    for name, query in queries.items():
+        timings = []
+        for _ in range(lookups):
+            project_id = random.choice(project_ids)
+            start = time.perf_counter()
+            query(project_id)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        print(
+            f"  {name:26}: median {statistics.median(timings) * 1000:9.2f} ms   "
+            f"p95 {percentile(timings, 95) * 1000:9.2f} ms"
+        )
+
+
+def percentile(sorted_values, percent: float) -> float:
+    """Nearest-rank percentile of an ascending list (never below the median)"""
+    rank = math.ceil(percent / 100 * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, default=10000)
+    parser.add_argument("--files", type=int, default=1000, help="file rows per project")
+    parser.add_argument("--sample-projects", type=int, default=20, help="projects for the insert comparison")
+    parser.add_argument("--lookups", type=int, default=200, help="lookups per query with indexes")
+    parser.add_argument("--unindexed-lookups", type=int, default=5, help="lookups per query without indexes")
+    parser.add_argument("--db", type=Path, help="database file (default: a temporary directory)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = args.db or Path(tmp) / "scale.db"
+        with contextlib.redirect_stdout(io.StringIO()):
+            database.init_database()
+
+        files = fake_files(args.files)
+        compare_inserts(files, args.sample_projects)
+
+        print(f"\nPopulating {args.projects} projects x {args.files} files")
+        project_ids = populate(args.projects, files)
+
+        print(f"\nLookups with indexes ({args.lookups} each)")
+        time_lookups(project_ids, args.lookups)
+
+        with database.get_db_connection() as conn:
+            for index in ("idx_files_project", "idx_documentation_project",
+                          "idx_kt_plans_project", "idx_user_progress_project_day"):
+                conn.execute(f"DROP INDEX IF EXISTS {index}")
+
+        print(f"\nLookups without indexes ({args.unindexed_lookups} each)")
+        time_lookups(project_ids, args.unindexed_lookups)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,445 @@
+import mmap
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# POSIX only; elsewhere the vector cache is only safe within one process
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Run the (relatively expensive) size check once per this many writes
+EVICT_INTERVAL = 100
+
+# Bytes per stored vector component (float32, native byte order)
+VECTOR_ITEM_SIZE = array('f').itemsize
+
+
+class SQLiteCache:
+    """
+    Persistent key/value cache stored in its own SQLite file.
+    Entries are evicted least-recently-used first once the cache grows past
+    `max_entries` or `max_bytes`; entries older than `ttl_seconds` are misses.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_entries: int,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None
+    ):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_last_used ON cache(last_used)")
+        conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached value, or None on a miss"""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """Get all cached values among `keys` in one round-trip"""
+
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        conn = self._conn()
+        now = time.time()
+        found = {}
+
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ','.join('?' * len(batch))
+            rows = conn.execute(
+                f"SELECT key, value, created_at FROM cache WHERE key IN ({placeholders})",
+                batch
+            ).fetchall()
+            for key, value, created_at in rows:
+                if self.ttl_seconds is None or now - created_at <= self.ttl_seconds:
+                    found[key] = value
+
+        if found:
+            conn.executemany(
+                "UPDATE cache SET last_used = ? WHERE key = ?",
+                [(now, key) for key in found]
+            )
+            conn.commit()
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+
+        return found
+
+    def set(self, key: str, value: str) -> None:
+        """Store a value"""
+        self.set_many([(key, value)])
+
+    def set_many(self, items: Iterable[Tuple[str, str]]) -> None:
+        """Store several values in one transaction"""
+
+        now = time.time()
+        rows = [(key, value, len(value), now, now) for key, value in items]
+        if not rows:
+            return
+
+        conn = self._conn()
+        conn.executemany("""
+            INSERT OR REPLACE INTO cache (key, value, size, created_at, last_used)
+            VALUES (?, ?, ?, ?, ?)
+        """, rows)
+        conn.commit()
+
+        with self._lock:
+            self._writes += len(rows)
+            due = self._writes >= EVICT_INTERVAL
+            if due:
+                self._writes = 0
+        if due:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Drop expired entries, then least-recently-used ones until within bounds
+        Returns: number of entries removed
+        """
+
+        conn = self._conn()
+        removed = 0
+
+        if self.ttl_seconds is not None:
+            removed += conn.execute(
+                "DELETE FROM cache WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,)
+            ).rowcount
+
+        count, total_bytes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache"
+        ).fetchone()
+
+        excess = max(count - self.max_entries, 0)
+        if self.max_bytes is not None and total_bytes > self.max_bytes and count:
+            # Estimate how many entries to drop from the average entry size
+            average = total_bytes / count
+            excess = max(excess, int((total_bytes - self.max_bytes) / average) + 1)
+
+        if excess:
+            removed += conn.execute("""
+                DELETE FROM cache WHERE key IN (
+                    SELECT key FROM cache ORDER BY last_used LIMIT ?
+                )
+            """, (excess,)).rowcount
+
+        conn.commit()
+        return removed
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+
+        count, total_bytes = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache"
+        ).fetchone()
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": count,
+            "bytes": total_bytes
+        }
+
+    def clear(self) -> None:
+        """Remove every entry"""
+        conn = self._conn()
+        conn.execute("DELETE FROM cache")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets readers proceed during writes"""
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+
+class VectorCache:
+    """
+    Persistent cache of float32 vectors (e.g. embeddings). Vectors are
+    appended to a flat `<path>.f32` file and read back through a memory map;
+    a SQLite table at `path` maps each key to its offset and dimension.
+    The vector file is append-only, so once it grows past `max_bytes` the
+    whole cache is cleared and starts over (with a new file, so maps other
+    processes still hold stay valid).
+    Processes sharing the cache (e.g. several server workers) serialize
+    appends and clears with an flock on `<path>.lock`.
+    """
+
+    def __init__(self, path: Path, max_bytes: Optional[int] = None):
+        self.path = Path(path)
+        self.vectors_path = self.path.with_suffix(".f32")
+        self.lock_path = self.path.with_suffix(".lock")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        # Guards the vector file and the map (a truncated file must never be read through a stale map)
+        self._lock = threading.Lock()
+        self._map: Optional[mmap.mmap] = None
+        self._map_inode: Optional[int] = None
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.vectors_path.touch()
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS vectors (
+                key TEXT PRIMARY KEY,
+                offset INTEGER NOT NULL,
+                dim INTEGER NOT NULL
+            )
+        """)
+        conn.commit()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        """Get all cached vectors among `keys`"""
+
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        conn = self._conn()
+        found = {}
+
+        # Look up and read under one lock, so a concurrent clear can't
+        # reuse an offset between the two
+        with self._lock, self._file_lock(exclusive=False):
+            self._drop_replaced_map()
+            rows = []
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ','.join('?' * len(batch))
+                rows += conn.execute(
+                    f"SELECT key, offset, dim FROM vectors WHERE key IN ({placeholders})",
+                    batch
+                ).fetchall()
+
+            for key, offset, dim in rows:
+                end = offset + dim * VECTOR_ITEM_SIZE
+                # Rows can outlive their bytes (e.g. a crash before the file was flushed)
+                if not self._mapped_up_to(end):
+                    continue
+                vector = array('f')
+                vector.frombytes(self._map[offset:end])
+                found[key] = vector.tolist()
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+
+        return found
+
+    def set_many(self, items: Iterable[Tuple[str, Sequence[float]]]) -> None:
+        """Append several vectors and index them in one transaction"""
+
+        rows = []
+        # Offsets are only valid while no other process appends or clears,
+        # so the rows are written under the same lock as the bytes
+        with self._lock, self._file_lock(exclusive=True):
+            if self.max_bytes is not None and self.vectors_path.stat().st_size > self.max_bytes:
+                self._clear()
+
+            with open(self.vectors_path, 'ab') as f:
+                offset = f.seek(0, os.SEEK_END)
+                for key, vector in items:
+                    data = array('f', vector).tobytes()
+                    f.write(data)
+                    rows.append((key, offset, len(data) // VECTOR_ITEM_SIZE))
+                    offset += len(data)
+
+            if rows:
+                conn = self._conn()
+                conn.executemany(
+                    "INSERT OR REPLACE INTO vectors (key, offset, dim) VALUES (?, ?, ?)",
+                    rows
+                )
+                conn.commit()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+
+        count = self._conn().execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": count,
+            "bytes": self.vectors_path.stat().st_size
+        }
+
+    def clear(self) -> None:
+        """Remove every entry"""
+        with self._lock, self._file_lock(exclusive=True):
+            self._clear()
+
+    def _clear(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        conn = self._conn()
+        conn.execute("DELETE FROM vectors")
+        conn.commit()
+        # Swap in a new empty file rather than truncating: truncating a file
+        # another process has mapped makes its reads fault (SIGBUS)
+        empty = self.vectors_path.with_suffix(".f32.tmp")
+        with open(empty, 'wb'):
+            pass
+        os.replace(empty, self.vectors_path)
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool) -> Iterator[None]:
+        """Cross-process lock on the vector file (shared for reads)"""
+
+        if fcntl is None:
+            yield
+            return
+
+        with open(self.lock_path, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _drop_replaced_map(self) -> None:
+        """Forget the map if another process has cleared (replaced) the vector file"""
+
+        if self._map is not None and os.stat(self.vectors_path).st_ino != self._map_inode:
+            self._map.close()
+            self._map = None
+
+    def _mapped_up_to(self, end: int) -> bool:
+        """Map the vector file, remapping if it has grown past the current map"""
+
+        if self._map is not None and end <= len(self._map):
+            return True
+
+        size = self.vectors_path.stat().st_size
+        if end > size:
+            return False
+
+        if self._map is not None:
+            self._map.close()
+        with open(self.vectors_path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._map_inode = os.fstat(f.fileno()).st_ino
+        return True
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets readers proceed during writes"""
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+
+class MemoryCache:
+    """
+    In-process LRU of arbitrary values; entries older than `ttl_seconds` are
+    misses. Values are shared, not copied, so callers must not mutate them.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a cached value, or None on a miss"""
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds is not None and time.monotonic() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used beyond max_entries"""
+
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """
+        Drop every entry whose key matches `predicate`
+        Returns: number of entries removed
+        """
+
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries)
+            }
+
+    def clear(self) -> None:
+        """Remove every entry"""
+        with self._lock:
+            self._entries.clear()
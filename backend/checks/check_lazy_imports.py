@@ -0,0 +1,59 @@
+"""
+Regression check: starting the API server stays cheap.
+
+Imports `main` in a fresh interpreter and fails (exit code 1) if any module
+that must only load on first use is already in sys.modules, or if the
+analyzer's process pool has been started. Timing is left to
+benchmarks/bench_import.py, which depends on the machine.
+
+Usage (from backend/):
+    python checks/check_lazy_imports.py
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+# Loaded by the requests that use them, never at startup
+LAZY_MODULES = ("openai", "httpx", "chromadb", "sentence_transformers", "torch")
+
+PROBE = f"""
+import json, multiprocessing, sys
+import main
+import analyzer.engine as engine
+print(json.dumps({{
+    "modules": [name for name in {LAZY_MODULES!r} if name in sys.modules],
+    "analyzer_pool": engine._pool is not None or bool(multiprocessing.active_children())
+}}))
+"""
+
+
+def main():
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=BACKEND, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        print(f"❌ import main failed:\n{result.stderr}")
+        sys.exit(1)
+
+    loaded = json.loads(result.stdout.strip().splitlines()[-1])
+
+    failed = False
+    if loaded["modules"]:
+        print(f"❌ Imported at startup but should be lazy: {', '.join(loaded['modules'])}")
+        failed = True
+    if loaded["analyzer_pool"]:
+        print("❌ Analyzer process pool started at import time")
+        failed = True
+
+    if failed:
+        sys.exit(1)
+    print("✅ No heavy modules or worker processes at startup")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Regression check: .gitignore files inside an uploaded ZIP are honored.
+
+Builds a ZIP whose .gitignore files exclude some code files, extracts it
+the way upload jobs do and scans the result. Exits with code 1 if an
+ignored file is extracted or scanned, or a kept one is missing.
+
+Usage (from backend/):
+    python checks/check_zip_gitignore.py
+"""
+
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pipeline import extract_supported_files, find_project_root
+from walker import walk_project_files
+
+MEMBERS = {
+    "project/.gitignore": "secret/\n*.gen.py\n!keep.gen.py\n",
+    "project/app.py": "x = 1\n",
+    "project/secret/hidden.py": "token = 'x'\n",
+    "project/models.gen.py": "x = 1\n",
+    "project/keep.gen.py": "x = 1\n",
+    "project/sub/.gitignore": "/local.py\n",
+    "project/sub/local.py": "x = 1\n",
+    "project/sub/deeper/local.py": "x = 1\n",
+}
+
+EXPECTED = {"app.py", "keep.gen.py", "sub/deeper/local.py"}
+
+
+def main():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        zip_path = Path(temp_dir) / "upload.zip"
+        with zipfile.ZipFile(zip_path, "w") as archive:
+            for name, content in MEMBERS.items():
+                archive.writestr(name, content)
+
+        extract_dir = Path(temp_dir) / "project"
+        extract_dir.mkdir()
+        extract_supported_files(zip_path, extract_dir)
+        root = find_project_root(extract_dir)
+
+        extracted = {
+            path.relative_to(root).as_posix()
+            for path in root.rglob("*.py")
+        }
+        scanned = {
+            path.relative_to(root).as_posix()
+            for path in walk_project_files(root)
+        }
+
+    failed = False
+    for label, found in (("extracted", extracted), ("scanned", scanned)):
+        if found != EXPECTED:
+            print(f"❌ {label}: {sorted(found)}, expected {sorted(EXPECTED)}")
+            failed = True
+
+    if failed:
+        sys.exit(1)
+    print("✅ ZIP .gitignore rules honored")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,91 @@
+import base64
 import json
+import os
+import re
+import threading
+import time
 import uuid
-from typing import List, Dict, Optional
+import zlib
+from typing import Iterator, List, Dict, Optional, Tuple
 from database import get_db_connection
+from doc_sections import split_sections
+from http_cache import bump_version, ALL_PROJECTS
 from datetime import datetime
 
+# Large TEXT values (documentation, KT plans, per-file analysis JSON) are
+# stored zlib-compressed as BLOBs starting with COMPRESSION_MARKER; readers
+# accept both forms, so rows written before compression still decode
+DB_COMPRESSION = os.environ.get("DB_COMPRESSION", "1") == "1"
+DB_COMPRESSION_MIN_BYTES = int(os.environ.get("DB_COMPRESSION_MIN_BYTES", "512"))
+DB_COMPRESSION_LEVEL = int(os.environ.get("DB_COMPRESSION_LEVEL", "6"))
+COMPRESSION_MARKER = b"Z1"
+
+# Columns holding compressible values, for the backfill and storage stats
+COMPRESSED_COLUMNS = {
+    "files": ("classes", "functions", "imports"),
+    "documentation": ("content",),
+    "documentation_sections": ("content",),
+    "kt_plans": ("plan",),
+}
+
+_codec_stats = {"encoded": 0, "raw_bytes": 0, "stored_bytes": 0, "decoded": 0, "decode_seconds": 0.0}
+_codec_lock = threading.Lock()
+
+# Fields selectable with ?fields= on the listing APIs → SQL expression
+PROJECT_FIELDS = {
+    'id': 'p.id',
+    'path': 'p.path',
+    'role': 'p.role',
+    'files_analyzed': 'p.files_analyzed',
+    'status': 'p.status',
+    'created_at': 'p.created_at',
+    'branch': 'p.branch',
+    'commit_sha': 'p.commit_sha',
+    'updated_at': 'p.updated_at',
+}
+
+# Names of a file's symbols of one kind, in source order, as a JSON array
+SYMBOL_NAMES = """(
+    SELECT json_group_array(name) FROM (
+        SELECT name FROM symbols s
+        WHERE s.project_id = f.project_id AND s.file_path = f.file_path AND s.kind = '{kind}'
+        ORDER BY s.line
+    )
+)"""
+
+FILE_FIELDS = {
+    'id': 'f.id',
+    'file_path': 'f.file_path',
+    'file_name': 'f.file_name',
+    'complexity': 'f.complexity',
+    'classes': 'f.classes',
+    'functions': 'f.functions',
+    'imports': 'f.imports',
+    # Names only (no docstrings/args), read from the symbols table
+    'class_names': SYMBOL_NAMES.format(kind='class'),
+    'function_names': SYMBOL_NAMES.format(kind='function'),
+}
+
+# Stored JSON columns (possibly compressed) and JSON built in SQL
+FILE_JSON_FIELDS = {'classes', 'functions', 'imports'}
+FILE_SQL_JSON_FIELDS = {'class_names', 'function_names'}
+
+# Subquery selecting the id of a project's current documentation row
+LATEST_DOCUMENTATION = """
+    SELECT id FROM documentation
+    WHERE project_id = ?
+    ORDER BY created_at DESC, id DESC
+    LIMIT 1
+"""
+
 def save_to_db(
     project_path: str, 
     analyzed_data: List[Dict], 
     documentation: str, 
-    kt_plan: Dict
+    kt_plan: Dict,
+    role: str = "fullstack",
+    branch: Optional[str] = None,
+    commit_sha: Optional[str] = None
 ) -> str:
     """
     Save project analysis, documentation, and KT plan to database
@@ -23,57 +100,260 @@ def save_to_db(
         
         # 1. Save project
         cursor.execute("""
-            INSERT INTO projects (id, path, role, files_analyzed, status)
-            VALUES (?, ?, ?, ?, ?)
+            INSERT INTO projects (id, path, role, files_analyzed, status, branch, commit_sha)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
         """, (
             project_id,
             project_path,
-            "fullstack",  # You can pass this as parameter
+            role,
             len(analyzed_data),
-            "completed"
+            "completed",
+            branch,
+            commit_sha
         ))
         
-        # 2. Save analyzed files
-        for file_data in analyzed_data:
-            cursor.execute("""
-                INSERT INTO files (
-                    project_id, file_path, file_name, 
-                    complexity, classes, functions, imports
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                project_id,
-                file_data['file_path'],
-                file_data['file_name'],
-                file_data['complexity'],
-                json.dumps(file_data.get('classes', [])),
-                json.dumps(file_data.get('functions', [])),
-                json.dumps(file_data.get('imports', []))
-            ))
-        
-        # 3. Save documentation
-        cursor.execute("""
-            INSERT INTO documentation (project_id, content)
-            VALUES (?, ?)
-        """, (project_id, documentation))
+        # 2. Save analyzed files and their symbols
+        insert_files(cursor, project_id, analyzed_data)
+        insert_symbols(cursor, project_id, analyzed_data)
+        
+        # 3. Save documentation (whole and split into sections)
+        insert_documentation(cursor, project_id, documentation)
         
         # 4. Save KT plan
         cursor.execute("""
             INSERT INTO kt_plans (project_id, plan)
             VALUES (?, ?)
-        """, (project_id, json.dumps(kt_plan)))
+        """, (project_id, encode_text(json.dumps(kt_plan))))
         
         # 5. Initialize progress tracking (create entries for each day)
-        if 'plan' in kt_plan:
-            for day_plan in kt_plan['plan']:
-                cursor.execute("""
-                    INSERT INTO user_progress (project_id, day, completed)
-                    VALUES (?, ?, ?)
-                """, (project_id, day_plan['day'], False))
+        init_progress(cursor, project_id, kt_plan)
+        
+        bump_version(ALL_PROJECTS)
     
     print(f"✅ Saved project to database: {project_id}")
     return project_id
 
+def update_project_analysis(
+    project_id: str,
+    changed_files: List[Dict],
+    removed_paths: List[str],
+    files_analyzed: int,
+    commit_sha: Optional[str],
+    documentation: Optional[str] = None,
+    kt_plan: Optional[Dict] = None
+):
+    """
+    Apply an incremental re-analysis to an existing project in one transaction.
+    Changed files replace their previous rows; documentation and KT plan are
+    only stored when they were regenerated.
+    """
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        
+        # 1. Drop rows for removed files and stale rows for changed ones
+        stale_paths = list(removed_paths) + [f['file_path'] for f in changed_files]
+        cursor.executemany("""
+            DELETE FROM files WHERE project_id = ? AND file_path = ?
+        """, [(project_id, path) for path in stale_paths])
+        cursor.executemany("""
+            DELETE FROM symbols WHERE project_id = ? AND file_path = ?
+        """, [(project_id, path) for path in stale_paths])
+        
+        # 2. Save re-analyzed files
+        insert_files(cursor, project_id, changed_files)
+        insert_symbols(cursor, project_id, changed_files)
+        
+        # 3. Save regenerated documentation / KT plan (latest row wins on read)
+        if documentation is not None:
+            insert_documentation(cursor, project_id, documentation)
+        
+        if kt_plan is not None:
+            cursor.execute("""
+                INSERT INTO kt_plans (project_id, plan)
+                VALUES (?, ?)
+            """, (project_id, encode_text(json.dumps(kt_plan))))
+            init_progress(cursor, project_id, kt_plan)
+        
+        # 4. Record the analyzed commit
+        cursor.execute("""
+            UPDATE projects
+            SET files_analyzed = ?, commit_sha = ?, updated_at = ?
+            WHERE id = ?
+        """, (files_analyzed, commit_sha, datetime.now(), project_id))
+        
+        bump_version(project_id, ALL_PROJECTS)
+    
+    print(f"✅ Updated project in database: {project_id}")
+
+def insert_documentation(cursor, project_id: str, documentation: str):
+    """Insert a documentation row and its sections"""
+    
+    cursor.execute("""
+        INSERT INTO documentation (project_id, content)
+        VALUES (?, ?)
+    """, (project_id, encode_text(documentation)))
+    
+    insert_sections(cursor, cursor.lastrowid, project_id, documentation)
+
+def encode_text(text: Optional[str]):
+    """Compress a value for storage when it is large enough to be worth it"""
+    
+    if text is None or not DB_COMPRESSION:
+        return text
+    
+    raw = text.encode('utf-8')
+    if len(raw) < DB_COMPRESSION_MIN_BYTES:
+        return text
+    
+    packed = COMPRESSION_MARKER + zlib.compress(raw, DB_COMPRESSION_LEVEL)
+    if len(packed) >= len(raw):
+        return text
+    
+    with _codec_lock:
+        _codec_stats["encoded"] += 1
+        _codec_stats["raw_bytes"] += len(raw)
+        _codec_stats["stored_bytes"] += len(packed)
+    return packed
+
+def decode_text(value) -> Optional[str]:
+    """Inverse of encode_text; plain TEXT values pass through unchanged"""
+    
+    if not isinstance(value, bytes):
+        return value
+    
+    if not value.startswith(COMPRESSION_MARKER):
+        return value.decode('utf-8')
+    
+    start = time.perf_counter()
+    text = zlib.decompress(value[len(COMPRESSION_MARKER):]).decode('utf-8')
+    with _codec_lock:
+        _codec_stats["decoded"] += 1
+        _codec_stats["decode_seconds"] += time.perf_counter() - start
+    return text
+
+def get_storage_stats() -> Dict:
+    """
+    On-disk size of the compressible columns, how many values are compressed,
+    and this process's compression ratio / decode latency
+    """
+    
+    tables = {}
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        
+        for table, columns in COMPRESSED_COLUMNS.items():
+            stored = " + ".join(f"COALESCE(LENGTH(CAST({column} AS BLOB)), 0)" for column in columns)
+            compressed = " + ".join(f"(typeof({column}) = 'blob')" for column in columns)
+            cursor.execute(f"""
+                SELECT COUNT(*), COALESCE(SUM({stored}), 0), COALESCE(SUM({compressed}), 0)
+                FROM {table}
+            """)
+            rows, stored_bytes, compressed_values = cursor.fetchone()
+            tables[table] = {
+                "rows": rows,
+                "stored_bytes": stored_bytes,
+                "compressed_values": compressed_values
+            }
+    
+    with _codec_lock:
+        codec = dict(_codec_stats)
+    
+    return {
+        "tables": tables,
+        "codec": {
+            "enabled": DB_COMPRESSION,
+            "values_encoded": codec["encoded"],
+            "bytes_saved": codec["raw_bytes"] - codec["stored_bytes"],
+            "ratio": round(codec["raw_bytes"] / codec["stored_bytes"], 2) if codec["stored_bytes"] else None,
+            "values_decoded": codec["decoded"],
+            "avg_decode_ms": round(codec["decode_seconds"] * 1000 / codec["decoded"], 3) if codec["decoded"] else None
+        }
+    }
+
+def insert_sections(cursor, documentation_id: int, project_id: str, content: str):
+    """Store a documentation row's sections"""
+    
+    cursor.executemany("""
+        INSERT INTO documentation_sections (
+            documentation_id, project_id, position, title, level, content, size
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, [
+        (
+            documentation_id, project_id, section['position'], section['title'], section['level'],
+            encode_text(section['content']), len(section['content'])
+        )
+        for section in split_sections(content)
+    ])
+
+def insert_files(cursor, project_id: str, analyzed_data: List[Dict]):
+    """Insert analyzed file rows for a project in one batched statement"""
+    
+    cursor.executemany("""
+        INSERT INTO files (
+            project_id, file_path, file_name, 
+            complexity, classes, functions, imports
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (
+        (
+            project_id,
+            file_data['file_path'],
+            file_data['file_name'],
+            file_data['complexity'],
+            encode_text(json.dumps(file_data.get('classes', []))),
+            encode_text(json.dumps(file_data.get('functions', []))),
+            encode_text(json.dumps(file_data.get('imports', [])))
+        )
+        for file_data in analyzed_data
+    ))
+
+def insert_symbols(cursor, project_id: str, analyzed_data: List[Dict]):
+    """Insert one symbols row per class, method and top-level function"""
+    
+    cursor.executemany("""
+        INSERT INTO symbols (
+            project_id, file_path, kind, name, parent, line, docstring
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (
+        (project_id, file_data['file_path'], *symbol)
+        for file_data in analyzed_data
+        for symbol in extract_symbols(file_data)
+    ))
+
+def extract_symbols(file_data: Dict) -> Iterator[tuple]:
+    """(kind, name, parent, line, docstring) for each symbol in a file analysis"""
+    
+    for class_info in file_data.get('classes', []):
+        yield ('class', class_info['name'], None, class_info.get('line_number'), class_info.get('docstring'))
+        for method in class_info.get('methods', []):
+            yield ('method', method['name'], class_info['name'], method.get('line_number'), method.get('docstring'))
+    
+    for function in file_data.get('functions', []):
+        yield ('function', function['name'], None, function.get('line_number'), function.get('docstring'))
+
+def init_progress(cursor, project_id: str, kt_plan: Dict):
+    """Create progress entries for KT days that don't have one yet"""
+    
+    if 'plan' not in kt_plan:
+        return
+    
+    cursor.execute("""
+        SELECT day FROM user_progress WHERE project_id = ?
+    """, (project_id,))
+    existing_days = {row[0] for row in cursor.fetchall()}
+    
+    cursor.executemany("""
+        INSERT INTO user_progress (project_id, day, completed)
+        VALUES (?, ?, ?)
+    """, [
+        (project_id, day_plan['day'], False)
+        for day_plan in kt_plan['plan']
+        if day_plan['day'] not in existing_days
+    ])
+
 def get_project(project_id: str) -> Optional[Dict]:
     """Get project details by ID"""
     
@@ -99,16 +379,83 @@ def get_documentation(project_id: str) -> Optional[str]:
         cursor.execute("""
             SELECT content FROM documentation 
             WHERE project_id = ?
-            ORDER BY created_at DESC
+            ORDER BY created_at DESC, id DESC
             LIMIT 1
         """, (project_id,))
         
         row = cursor.fetchone()
         
         if row:
-            return row['content']
+            return decode_text(row['content'])
         return None
 
+def get_documentation_outline(project_id: str) -> List[Dict]:
+    """Get titles and sizes of the latest documentation's sections (no content)"""
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT position, title, level, COALESCE(size, LENGTH(content)) AS size
+            FROM documentation_sections
+            WHERE documentation_id = (""" + LATEST_DOCUMENTATION + """)
+            ORDER BY position
+        """, (project_id,))
+        
+        return [dict(row) for row in cursor.fetchall()]
+
+def get_documentation_section(project_id: str, position: int) -> Optional[Dict]:
+    """Get one section of the latest documentation"""
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT position, title, level, content
+            FROM documentation_sections
+            WHERE documentation_id = (""" + LATEST_DOCUMENTATION + """)
+            AND position = ?
+        """, (project_id, position))
+        
+        row = cursor.fetchone()
+        
+        if row:
+            return {**dict(row), 'content': decode_text(row['content'])}
+        return None
+
+def iter_documentation_sections(project_id: str) -> Iterator[Dict]:
+    """
+    Yield the latest documentation's sections in order, reading one section
+    per query so no connection is held open (or shared across threads)
+    while the caller streams them
+    """
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT documentation_id, position FROM documentation_sections
+            WHERE documentation_id = (""" + LATEST_DOCUMENTATION + """)
+            ORDER BY position
+        """, (project_id,))
+        
+        sections = [tuple(row) for row in cursor.fetchall()]
+    
+    for documentation_id, position in sections:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT position, title, level, content
+                FROM documentation_sections
+                WHERE documentation_id = ? AND position = ?
+            """, (documentation_id, position))
+            
+            row = cursor.fetchone()
+        
+        if row:
+            yield {**dict(row), 'content': decode_text(row['content'])}
+
 def get_kt_plan(project_id: str) -> Optional[Dict]:
     """Get KT plan for a project"""
     
@@ -118,14 +465,14 @@ def get_kt_plan(project_id: str) -> Optional[Dict]:
         cursor.execute("""
             SELECT plan FROM kt_plans 
             WHERE project_id = ?
-            ORDER BY created_at DESC
+            ORDER BY created_at DESC, id DESC
             LIMIT 1
         """, (project_id,))
         
         row = cursor.fetchone()
         
         if row:
-            return json.loads(row['plan'])
+            return json.loads(decode_text(row['plan']))
         return None
 
 def get_files(project_id: str) -> List[Dict]:
@@ -144,13 +491,177 @@ def get_files(project_id: str) -> List[Dict]:
         for row in rows:
             file_dict = dict(row)
             # Parse JSON strings back to objects
-            file_dict['classes'] = json.loads(file_dict['classes'])
-            file_dict['functions'] = json.loads(file_dict['functions'])
-            file_dict['imports'] = json.loads(file_dict['imports'])
+            file_dict['classes'] = json.loads(decode_text(file_dict['classes']))
+            file_dict['functions'] = json.loads(decode_text(file_dict['functions']))
+            file_dict['imports'] = json.loads(decode_text(file_dict['imports']))
             files.append(file_dict)
         
         return files
 
+def search_symbols(
+    project_id: str,
+    query: str,
+    kind: Optional[str] = None,
+    limit: int = 50,
+    match_any: bool = False
+) -> List[Dict]:
+    """
+    Find classes, methods and functions whose name or docstring matches
+    `query` (prefix match per word; every word, or any with `match_any`).
+    Uses the FTS5 index when SQLite has it, otherwise falls back to LIKE on
+    names and docstrings.
+    """
+    
+    terms = re.findall(r'\w+', query)
+    if not terms:
+        return []
+    
+    kind_filter = "AND s.kind = ?" if kind else ""
+    kind_params = (kind,) if kind else ()
+    
+    # A name equal to any one term ranks first (whole multi-word or prose
+    # queries never equal a single identifier)
+    exact_rank = f"s.name COLLATE NOCASE IN ({', '.join('?' * len(terms))}) DESC"
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'symbols_fts'")
+        if cursor.fetchone():
+            # The project filter is part of the MATCH so FTS only visits this
+            # project's postings; exact name matches rank first, then BM25
+            # with names weighted over docstrings
+            words = (' OR ' if match_any else ' AND ').join(f'"{term}"*' for term in terms)
+            match = f'project_id : "{project_id.replace(chr(34), chr(34) * 2)}" AND ({words})'
+            cursor.execute(f"""
+                SELECT s.kind, s.name, s.parent, s.file_path, s.line, s.docstring
+                FROM symbols_fts
+                JOIN symbols s ON s.id = symbols_fts.rowid
+                WHERE symbols_fts MATCH ? AND s.project_id = ? {kind_filter}
+                ORDER BY {exact_rank}, bm25(symbols_fts, 10.0, 1.0, 0.0)
+                LIMIT ?
+            """, (match, project_id, *kind_params, *terms, limit))
+        else:
+            patterns = [f"%{term}%" for term in terms] if match_any else [f"%{query.strip()}%"]
+            matches = ' OR '.join(["(s.name LIKE ? OR s.docstring LIKE ?)"] * len(patterns))
+            cursor.execute(f"""
+                SELECT s.kind, s.name, s.parent, s.file_path, s.line, s.docstring
+                FROM symbols s
+                WHERE s.project_id = ? {kind_filter}
+                AND ({matches})
+                ORDER BY {exact_rank}, length(s.name)
+                LIMIT ?
+            """, (project_id, *kind_params, *[p for pattern in patterns for p in (pattern, pattern)], *terms, limit))
+        
+        return [dict(row) for row in cursor.fetchall()]
+
+def list_files(
+    project_id: str,
+    limit: int = 200,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = None
+) -> Tuple[List[Dict], Optional[str]]:
+    """
+    One page of a project's files ordered by path, selecting only `fields`
+    (all stored columns by default). Continue with the returned cursor.
+    Returns: (files, next_cursor or None on the last page)
+    """
+    
+    fields = _check_fields(fields, FILE_FIELDS) or [
+        'id', 'file_path', 'file_name', 'complexity', 'classes', 'functions', 'imports'
+    ]
+    after = _decode_cursor(cursor, 2) if cursor else None
+    
+    keyset = "AND (f.file_path, f.id) > (?, ?)" if after else ""
+    params = (project_id, *after, limit + 1) if after else (project_id, limit + 1)
+    
+    with get_db_connection() as conn:
+        db_cursor = conn.cursor()
+        
+        db_cursor.execute(f"""
+            SELECT f.file_path AS _path, f.id AS _id, {', '.join(f'{FILE_FIELDS[field]} AS {field}' for field in fields)}
+            FROM files f
+            WHERE f.project_id = ? {keyset}
+            ORDER BY f.file_path, f.id
+            LIMIT ?
+        """, params)
+        
+        rows = db_cursor.fetchall()
+    
+    page = rows[:limit]
+    files = []
+    for row in page:
+        file_dict = {}
+        for field in fields:
+            value = row[field]
+            if field in FILE_JSON_FIELDS:
+                value = json.loads(decode_text(value))
+            elif field in FILE_SQL_JSON_FIELDS:
+                value = json.loads(value)
+            file_dict[field] = value
+        files.append(file_dict)
+    
+    next_cursor = _encode_cursor(page[-1]['_path'], page[-1]['_id']) if len(rows) > limit else None
+    return files, next_cursor
+
+def list_projects(
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = None
+) -> Tuple[List[Dict], Optional[str]]:
+    """
+    One page of projects, newest first, selecting only `fields` (all by
+    default). Continue with the returned cursor.
+    Returns: (projects, next_cursor or None on the last page)
+    """
+    
+    fields = _check_fields(fields, PROJECT_FIELDS) or list(PROJECT_FIELDS)
+    before = _decode_cursor(cursor, 2) if cursor else None
+    
+    keyset = "WHERE (p.created_at, p.id) < (?, ?)" if before else ""
+    params = (*before, limit + 1) if before else (limit + 1,)
+    
+    with get_db_connection() as conn:
+        db_cursor = conn.cursor()
+        
+        db_cursor.execute(f"""
+            SELECT p.created_at AS _created_at, p.id AS _id, {', '.join(f'{PROJECT_FIELDS[field]} AS {field}' for field in fields)}
+            FROM projects p
+            {keyset}
+            ORDER BY p.created_at DESC, p.id DESC
+            LIMIT ?
+        """, params)
+        
+        rows = db_cursor.fetchall()
+    
+    page = rows[:limit]
+    projects = [{field: row[field] for field in fields} for row in page]
+    
+    next_cursor = _encode_cursor(page[-1]['_created_at'], page[-1]['_id']) if len(rows) > limit else None
+    return projects, next_cursor
+
+def _check_fields(fields: Optional[List[str]], allowed: Dict) -> List[str]:
+    """Validate a ?fields= projection (ValueError on unknown names)"""
+    
+    unknown = [field for field in fields or [] if field not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)} (allowed: {', '.join(allowed)})")
+    return list(dict.fromkeys(fields or []))
+
+def _encode_cursor(*values) -> str:
+    """Opaque pagination cursor for the last row's sort key"""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+def _decode_cursor(cursor: str, size: int) -> tuple:
+    """Inverse of _encode_cursor (ValueError if malformed)"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return tuple(values)
+
 def get_user_progress(project_id: str) -> List[Dict]:
     """Get user's KT progress"""
     
@@ -184,6 +695,8 @@ def update_progress(project_id: str, day: int, completed: bool, notes: str = Non
                 SET completed = ?, notes = ?
                 WHERE project_id = ? AND day = ?
             """, (False, notes, project_id, day))
+        
+        bump_version(project_id)
 
 def get_all_projects() -> List[Dict]:
     """Get all projects"""
@@ -1,96 +1,103 @@
+import os
 import sqlite3
+import threading
 from contextlib import contextmanager
 from pathlib import Path
 
 # Database file location
 DB_PATH = Path("./data/kt_generator.db")
 
-def init_database():
-    """Initialize database with required tables"""
+# Seconds a writer waits for the write lock before "database is locked"
+DB_BUSY_TIMEOUT = float(os.environ.get("DB_BUSY_TIMEOUT", "10"))
+
+# Per-connection page cache and memory-mapped I/O window
+DB_CACHE_SIZE_MB = int(os.environ.get("DB_CACHE_SIZE_MB", "64"))
+DB_MMAP_SIZE_MB = int(os.environ.get("DB_MMAP_SIZE_MB", "256"))
+
+# One connection per thread (job workers, the event loop, threadpool workers)
+_local = threading.local()
+
+def init_database(background: bool = True):
+    """
+    Create the data directory and apply pending schema migrations
+    (backfills of existing rows continue in the background unless
+    `background` is False)
+    """
     
     # Create data directory if it doesn't exist
     DB_PATH.parent.mkdir(exist_ok=True)
     
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Projects table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS projects (
-            id TEXT PRIMARY KEY,
-            path TEXT NOT NULL,
-            role TEXT NOT NULL,
-            files_analyzed INTEGER,
-            status TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Files table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS files (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            project_id TEXT NOT NULL,
-            file_path TEXT NOT NULL,
-            file_name TEXT NOT NULL,
-            complexity INTEGER,
-            classes TEXT,  -- JSON string
-            functions TEXT,  -- JSON string
-            imports TEXT,  -- JSON string
-            FOREIGN KEY (project_id) REFERENCES projects(id)
-        )
-    """)
-    
-    # Documentation table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS documentation (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            project_id TEXT NOT NULL,
-            content TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (project_id) REFERENCES projects(id)
-        )
-    """)
-    
-    # KT Plans table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS kt_plans (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            project_id TEXT NOT NULL,
-            plan TEXT NOT NULL,  -- JSON string
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (project_id) REFERENCES projects(id)
-        )
-    """)
-    
-    # User Progress table (for tracking KT completion)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS user_progress (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            project_id TEXT NOT NULL,
-            day INTEGER NOT NULL,
-            completed BOOLEAN DEFAULT FALSE,
-            completed_at TIMESTAMP,
-            notes TEXT,
-            FOREIGN KEY (project_id) REFERENCES projects(id)
-        )
-    """)
-    
-    conn.commit()
-    conn.close()
+    # Imported here: migrations builds on this module's connections
+    from migrations import apply_migrations
+    apply_migrations(background=background)
     
     print(f"✅ Database initialized at {DB_PATH}")
 
 @contextmanager
 def get_db_connection():
-    """Context manager for database connections"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+    """
+    Context manager for database access on this thread's pooled connection.
+    Commits when the outermost block exits (rolls back on error), so nested
+    blocks share one transaction.
+    """
+    conn = get_thread_connection()
+    _local.depth = getattr(_local, "depth", 0) + 1
     try:
         yield conn
-        conn.commit()
+        if _local.depth == 1:
+            conn.commit()
+            callbacks, _local.on_commit = getattr(_local, "on_commit", []), []
+            for callback in callbacks:
+                callback()
     except Exception as e:
-        conn.rollback()
+        if _local.depth == 1:
+            conn.rollback()
+            _local.on_commit = []
         raise e
     finally:
-        conn.close()
\ No newline at end of file
+        _local.depth -= 1
+
+def on_commit(callback):
+    """Run `callback` once this thread's open transaction commits (right away outside one)"""
+    
+    if getattr(_local, "depth", 0) == 0:
+        callback()
+    else:
+        _local.on_commit = getattr(_local, "on_commit", []) + [callback]
+
+def get_thread_connection() -> sqlite3.Connection:
+    """This thread's connection, opened and tuned on first use"""
+    
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "path", None) != DB_PATH:
+        if conn is not None:
+            conn.close()
+        conn = connect(DB_PATH)
+        _local.conn = conn
+        _local.path = DB_PATH
+    return conn
+
+def connect(path: Path) -> sqlite3.Connection:
+    """
+    Open a connection with WAL (readers don't block behind writers),
+    synchronous=NORMAL (no fsync per commit; durable at checkpoints),
+    a larger page cache and memory-mapped reads
+    """
+    
+    conn = sqlite3.connect(path, timeout=DB_BUSY_TIMEOUT)
+    conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT * 1000)}")
+    conn.execute(f"PRAGMA cache_size={-DB_CACHE_SIZE_MB * 1024}")
+    conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE_MB * 1024 * 1024}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+def close_thread_connection():
+    """Close this thread's connection (e.g. before a worker thread exits)"""
+    
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
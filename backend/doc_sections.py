@@ -0,0 +1,57 @@
+import re
+from typing import Dict, List
+
+# Headings at or above this level start a new stored section (## = 2);
+# deeper headings stay inside their parent section
+SECTION_MAX_LEVEL = 2
+
+HEADING = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+FENCE = re.compile(r'^\s*(```|~~~)')
+EMPHASIS = re.compile(r'[*_`]')
+
+
+def split_sections(markdown: str) -> List[Dict]:
+    """
+    Split a markdown document into sections at its top-level headings.
+    Text before the first heading becomes an untitled section; headings
+    inside fenced code blocks are ignored.
+    Returns: [{'position', 'title', 'level', 'content'}] in document order
+    """
+
+    sections = []
+    current = {'title': '', 'level': 0, 'lines': []}
+    fence = None
+
+    for line in (markdown or '').splitlines(keepends=True):
+        fence_match = FENCE.match(line)
+        if fence_match:
+            marker = fence_match.group(1)
+            if fence is None:
+                fence = marker
+            elif fence == marker:
+                fence = None
+
+        heading = HEADING.match(line) if fence is None else None
+        if heading and len(heading.group(1)) <= SECTION_MAX_LEVEL:
+            sections.append(current)
+            current = {
+                'title': EMPHASIS.sub('', heading.group(2)).strip(),
+                'level': len(heading.group(1)),
+                'lines': []
+            }
+
+        current['lines'].append(line)
+
+    sections.append(current)
+
+    return [
+        {
+            'position': position,
+            'title': section['title'],
+            'level': section['level'],
+            'content': ''.join(section['lines'])
+        }
+        for position, section in enumerate(
+            section for section in sections if ''.join(section['lines']).strip()
+        )
+    ]
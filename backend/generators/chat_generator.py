@@ -0,0 +1,106 @@
+import asyncio
+import os
+import re
+from typing import AsyncIterator, Dict, List, Tuple
+
+from generators.doc_generator import estimate_tokens, truncate_to_tokens
+from generators.llm_client import relay_chat_stream, LLM_BASE_URL
+from rag.embeddings import search_codebase
+
+# Retrieved chunks considered per question, and the share of them that fits
+# in the prompt (estimated at ~4 characters per token)
+CHAT_RETRIEVED_CHUNKS = int(os.environ.get("CHAT_RETRIEVED_CHUNKS", "12"))
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.environ.get("CHAT_CONTEXT_TOKEN_BUDGET", "3000"))
+CHAT_MAX_TOKENS = int(os.environ.get("CHAT_MAX_TOKENS", "1000"))
+
+# Without an API key or endpoint (or with CHAT_MOCK=1), answers come from a
+# local mock that streams like the model, for offline testing
+CHAT_MOCK = os.environ.get("CHAT_MOCK") == "1" or not (os.environ.get("OPENAI_API_KEY") or LLM_BASE_URL)
+CHAT_MOCK_DELAY = float(os.environ.get("CHAT_MOCK_DELAY", "0.01"))
+
+async def answer_question(question: str, project: Dict) -> AsyncIterator[Tuple[str, Dict]]:
+    """
+    Answer a question about a project as (event, data) pairs: "sources" as
+    soon as retrieval is done, then "token" deltas as the answer is written,
+    then "done"
+    """
+
+    results = await asyncio.to_thread(search_codebase, question, project['id'], CHAT_RETRIEVED_CHUNKS)
+    context, sources = assemble_context(results)
+    yield "sources", {"sources": sources}
+
+    if CHAT_MOCK:
+        deltas = mock_stream(question, sources)
+    else:
+        deltas = relay_chat_stream(build_chat_prompt(question, context, project['role']), CHAT_MAX_TOKENS)
+
+    async for delta in deltas:
+        yield "token", {"text": delta}
+
+    yield "done", {}
+
+def assemble_context(results: Dict, budget: int = CHAT_CONTEXT_TOKEN_BUDGET) -> Tuple[str, List[Dict]]:
+    """
+    Pack retrieved chunks, best first, into at most `budget` tokens. Chunks
+    already covered (same text, or lines inside an included method/function
+    of the same file) are skipped, as are chunks that no longer fit, in
+    favour of smaller ones further down the ranking.
+    Returns: (context, metadata of the chunks used)
+    """
+
+    parts, sources = [], []
+    seen = set()
+    covered: Dict[str, List[Tuple[int, int]]] = {}
+    used = 0
+
+    for document, metadata in zip(results['documents'][0], results['metadatas'][0]):
+        path = metadata.get('file_path')
+        start, end = metadata.get('start_line'), metadata.get('end_line')
+
+        if document in seen:
+            continue
+        if start and any(first <= start and end <= last for first, last in covered.get(path, [])):
+            continue
+
+        block = f"--- {path} (lines {start}-{end})\n{document}" if start else f"--- {path}\n{document}"
+        cost = estimate_tokens(block)
+        if used + cost > budget:
+            if parts:
+                continue
+            # Never send an empty context: cut the best chunk down instead
+            block = truncate_to_tokens(block, budget)
+            cost = budget
+
+        parts.append(block)
+        sources.append(metadata)
+        seen.add(document)
+        used += cost
+        # Class and file chunks hold a header / summary, not all of their lines
+        if start and metadata.get('kind') in ('method', 'function'):
+            covered.setdefault(path, []).append((start, end))
+
+    return '\n\n'.join(parts), sources
+
+def build_chat_prompt(question: str, context: str, role: str) -> str:
+    """Prompt answering a question from retrieved code"""
+
+    return f"""You are helping a {role} developer understand a codebase. Answer the question using the code excerpts below.
+
+Question: {question}
+
+Relevant code:
+{context or "(no matching code found)"}
+
+Give a clear, concise answer. Refer to files and line numbers from the excerpts, include short code examples where they help, and say so if the excerpts don't contain the answer."""
+
+async def mock_stream(question: str, sources: List[Dict]) -> AsyncIterator[str]:
+    """Stream a canned answer word by word, like the model would"""
+
+    lines = [f"Mock answer for: {question}", "", f"Relevant code found: {len(sources)} excerpts"]
+    for source in sources:
+        name = source.get('name') or source.get('file_name')
+        lines.append(f"- {name} ({source.get('file_path')}:{source.get('start_line', 1)})")
+
+    for word in re.findall(r'\S+\s*|\s+', '\n'.join(lines)):
+        await asyncio.sleep(CHAT_MOCK_DELAY)
+        yield word
@@ -1,22 +1,115 @@
-from openai import OpenAI
+import asyncio
+import hashlib
 import os
-from typing import List, Dict
-from dotenv import load_dotenv
+from pathlib import PurePosixPath
+from typing import Callable, Dict, List, Optional
 
-# Load environment variables
-load_dotenv()
+from generators.llm_client import chat, chat_stream, run
 
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+# Token budgets (estimated at ~4 characters per token)
+DOC_CONTEXT_TOKEN_BUDGET = int(os.environ.get("DOC_CONTEXT_TOKEN_BUDGET", "24000"))
+DOC_GROUP_TOKEN_BUDGET = int(os.environ.get("DOC_GROUP_TOKEN_BUDGET", "12000"))
+DOC_SUMMARY_MAX_TOKENS = int(os.environ.get("DOC_SUMMARY_MAX_TOKENS", "800"))
+DOC_MAX_TOKENS = 4000
+
+# Package summaries requested at the same time
+DOC_MAP_CONCURRENCY = int(os.environ.get("DOC_MAP_CONCURRENCY", "8"))
 
 def generate_documentation(analyzed_files: List[Dict], role: str) -> str:
-    """Generate comprehensive documentation using OpenAI"""
+    """Generate comprehensive documentation using OpenAI (blocking wrapper)"""
+    return run(agenerate_documentation(analyzed_files, role))
+
+async def agenerate_documentation(
+    analyzed_files: List[Dict],
+    role: str,
+    on_token: Optional[Callable[[str], None]] = None
+) -> str:
+    """
+    Generate comprehensive documentation using OpenAI.
+    Projects whose context would exceed DOC_CONTEXT_TOKEN_BUDGET are
+    documented hierarchically (see generate_documentation_hierarchical).
+    With `on_token`, the final document is streamed to it as it is written.
+    """
 
     # Prepare context
     context = prepare_context(analyzed_files)
 
-    prompt = f"""You are a technical documentation expert. Generate comprehensive, beginner-friendly documentation for this codebase.
+    if estimate_tokens(context) > DOC_CONTEXT_TOKEN_BUDGET:
+        return await generate_documentation_hierarchical(analyzed_files, role, on_token)
+
+    return await write_documentation(build_documentation_prompt(f"Project Analysis:\n{context}", role), on_token)
+
+async def generate_documentation_hierarchical(
+    analyzed_files: List[Dict],
+    role: str,
+    on_token: Optional[Callable[[str], None]] = None
+) -> str:
+    """
+    Map-reduce documentation for large projects: files are grouped by package,
+    each group is summarized concurrently, and the summaries are reduced
+    (repeatedly, if needed) into the final document
+    """
+
+    groups = group_files_by_package(analyzed_files)
+    batches = pack_batches(
+        [(package, prepare_context(files, with_paths=True)) for package, files in groups.items()],
+        DOC_GROUP_TOKEN_BUDGET
+    )
+    print(f"📚 Summarizing {len(groups)} packages in {len(batches)} batches")
+
+    summaries = await summarize_batches(batches, role)
+
+    # Reduce until the summaries fit the final prompt's budget
+    while len(summaries) > 1 and estimate_tokens('\n\n'.join(summaries)) > DOC_CONTEXT_TOKEN_BUDGET:
+        batches = pack_batches(
+            [(f"summary {index + 1}", summary) for index, summary in enumerate(summaries)],
+            DOC_GROUP_TOKEN_BUDGET
+        )
+        if len(batches) >= len(summaries):
+            break
+        summaries = await summarize_batches(batches, role)
+
+    context = truncate_to_tokens('\n\n'.join(summaries), DOC_CONTEXT_TOKEN_BUDGET)
+    return await write_documentation(build_documentation_prompt(f"Package Summaries:\n{context}", role), on_token)
+
+async def write_documentation(prompt: str, on_token: Optional[Callable[[str], None]] = None) -> str:
+    """Run the final documentation prompt, streaming deltas to `on_token` when given"""
+
+    if on_token is None:
+        return await chat(prompt, DOC_MAX_TOKENS)
+
+    parts = []
+    async for delta in chat_stream(prompt, DOC_MAX_TOKENS):
+        parts.append(delta)
+        on_token(delta)
+    return ''.join(parts)
+
+async def summarize_batches(batches: List[Dict], role: str) -> List[str]:
+    """Summarize batches concurrently, keeping input order"""
+
+    # Leave LLM capacity for other jobs even when one project has many packages
+    semaphore = asyncio.Semaphore(DOC_MAP_CONCURRENCY)
+
+    async def summarize(batch: Dict) -> str:
+        prompt = f"""You are a technical documentation expert. Summarize this part of a larger codebase for someone writing its documentation.
+
+{batch['context']}
+
+Describe the responsibility of each package, its main classes and functions, and how it relates to the rest of the system.
+Focus on: {role} perspective
+Be concise: at most a few short paragraphs.
+"""
+        async with semaphore:
+            summary = await chat(prompt, DOC_SUMMARY_MAX_TOKENS)
+        return f"### {', '.join(batch['names'])}\n{summary}"
+
+    return list(await asyncio.gather(*(summarize(batch) for batch in batches)))
+
+def build_documentation_prompt(context: str, role: str) -> str:
+    """Final documentation prompt around a project analysis or package summaries"""
+
+    return f"""You are a technical documentation expert. Generate comprehensive, beginner-friendly documentation for this codebase.
 
-Project Analysis:
 {context}
 
 Generate documentation with these sections:
@@ -31,20 +124,94 @@ Focus on: {role} perspective
 Make it clear for someone new to this codebase.
 """
 
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        max_tokens=4000,
-        messages=[{"role": "user", "content": prompt}]
-    )
+def group_files_by_package(analyzed_files: List[Dict]) -> Dict[str, List[Dict]]:
+    """Group files by their directory (the project root is '.')"""
+
+    groups: Dict[str, List[Dict]] = {}
+    for file in sorted(analyzed_files, key=lambda f: f['file_path']):
+        package = str(PurePosixPath(file['file_path']).parent)
+        groups.setdefault(package, []).append(file)
+    return groups
+
+def pack_batches(items: List[tuple], budget: int) -> List[Dict]:
+    """
+    Pack (name, text) items into batches of at most `budget` tokens.
+    Small items share a batch; an item larger than the budget is split on
+    line boundaries across several batches. Batches end after items chosen
+    by a hash of their name (see ends_batch) rather than wherever the budget
+    runs out, so adding or resizing one item only reshapes the batches up to
+    the next such boundary and the other map prompts stay cache hits.
+    """
+
+    batches = []
+    current = {'names': [], 'context': '', 'tokens': 0}
+
+    def flush():
+        if current['names']:
+            batches.append({'names': current['names'], 'context': current['context']})
+        current.update(names=[], context='', tokens=0)
+
+    for name, text in items:
+        for part in split_to_budget(text, budget):
+            tokens = estimate_tokens(part)
+            if current['tokens'] + tokens > budget:
+                flush()
+            if name not in current['names']:
+                current['names'].append(name)
+            current['context'] += f"\n## {name}\n{part}"
+            current['tokens'] += tokens
+        if ends_batch(name, estimate_tokens(text), budget):
+            flush()
+    flush()
+
+    return batches
+
+def ends_batch(name: str, tokens: int, budget: int) -> bool:
+    """
+    Whether a batch closes after this item: true with probability
+    2 * tokens / budget, decided by the name's hash (so batches average about
+    half the budget, and the decision only changes when the item's size does)
+    """
+
+    digest = hashlib.sha256(name.encode('utf-8', errors='surrogateescape')).digest()
+    return int.from_bytes(digest[:8], 'big') % budget < 2 * tokens
+
+def split_to_budget(text: str, budget: int) -> List[str]:
+    """Split text on line boundaries into parts of at most `budget` tokens"""
+
+    if estimate_tokens(text) <= budget:
+        return [text]
+
+    parts, current = [], []
+    size = 0
+    for line in text.splitlines(keepends=True):
+        line = truncate_to_tokens(line, budget)
+        if current and size + estimate_tokens(line) > budget:
+            parts.append(''.join(current))
+            current, size = [], 0
+        current.append(line)
+        size += estimate_tokens(line)
+    if current:
+        parts.append(''.join(current))
+    return parts
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English and code)"""
+    return len(text) // 4 + 1
 
-    return response.choices[0].message.content
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """Cut text down to roughly `budget` tokens"""
+    limit = budget * 4
+    if len(text) <= limit:
+        return text
+    return text[:limit] + "\n... (truncated)"
 
-def prepare_context(analyzed_files: List[Dict]) -> str:
+def prepare_context(analyzed_files: List[Dict], with_paths: bool = False) -> str:
     """Convert analysis data to readable context"""
     context = []
     
     for file in analyzed_files:
-        file_summary = f"\n### File: {file['file_name']}\n"
+        file_summary = f"\n### File: {file['file_path'] if with_paths else file['file_name']}\n"
         
         if file['classes']:
             file_summary += "Classes:\n"
@@ -1,19 +1,267 @@
-from openai import OpenAI
+import json
 import os
-from typing import List, Dict
-from dotenv import load_dotenv
+import re
+from typing import Callable, List, Dict, Optional
 
-# Load environment variables
-load_dotenv()
+from generators.llm_client import chat, chat_stream, run
 
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+# Request JSON output and parse days incrementally while the plan streams in
+KT_STRUCTURED_OUTPUT = os.environ.get("KT_STRUCTURED_OUTPUT", "1") == "1"
 
-def create_kt_plan(analyzed_files: List[Dict], role: str) -> Dict:
-    """Generate personalized Knowledge Transfer plan"""
+# Attempts to regenerate a single malformed day before failing the plan
+KT_DAY_REPAIR_ATTEMPTS = int(os.environ.get("KT_DAY_REPAIR_ATTEMPTS", "2"))
+
+KT_MAX_TOKENS = 3000
+KT_DAY_MAX_TOKENS = 800
+
+# Length of the plan the prompt asks for; days the answer lacks are generated one by one
+KT_PLAN_DAYS = 10
+
+def create_kt_plan(
+    analyzed_files: List[Dict],
+    role: str,
+    on_day: Optional[Callable[[Dict], None]] = None
+) -> Dict:
+    """Generate personalized Knowledge Transfer plan (blocking wrapper)"""
+    return run(acreate_kt_plan(analyzed_files, role, on_day))
+
+async def acreate_kt_plan(
+    analyzed_files: List[Dict],
+    role: str,
+    on_day: Optional[Callable[[Dict], None]] = None
+) -> Dict:
+    """
+    Generate personalized Knowledge Transfer plan.
+    In structured mode `on_day` is called with each day as soon as it has
+    streamed in, before the rest of the plan is finished.
+    """
     
     context = prepare_kt_context(analyzed_files, role)
+    prompt = build_kt_prompt(context, role)
+    
+    if not KT_STRUCTURED_OUTPUT:
+        plan = parse_kt_response(await chat(prompt, KT_MAX_TOKENS))
+        if on_day:
+            for day_plan in plan.get('plan', []):
+                on_day(day_plan)
+        return await complete_plan(plan, context, role, on_day)
+    
+    return await stream_kt_plan(prompt, context, role, on_day)
+
+async def stream_kt_plan(
+    prompt: str,
+    context: str,
+    role: str,
+    on_day: Optional[Callable[[Dict], None]] = None
+) -> Dict:
+    """
+    Stream a JSON-mode KT plan, emitting days as they complete. Days that
+    fail to parse are regenerated individually instead of redoing the plan.
+    """
+    
+    parser = PlanStreamParser()
+    days = []
+    malformed = []
+    
+    async for delta in chat_stream(prompt, KT_MAX_TOKENS, response_format={"type": "json_object"}):
+        for raw_day in parser.feed(delta):
+            position = len(days) + len(malformed) + 1
+            day_plan = parse_day(raw_day)
+            if day_plan is None:
+                malformed.append((position, raw_day))
+                continue
+            days.append(day_plan)
+            if on_day:
+                on_day(day_plan)
+    
+    if not parser.found_plan:
+        # Model ignored the requested structure; fall back to whole-response parsing
+        plan = parse_kt_response(parser.buffer)
+        if on_day:
+            for day_plan in plan.get('plan', []):
+                on_day(day_plan)
+        return await complete_plan(plan, context, role, on_day)
+    
+    # Stream ended before the closing "]" (e.g. cut off at KT_MAX_TOKENS):
+    # a day it stopped inside is rebuilt like a malformed one
+    if not parser.done:
+        print(f"⚠️ KT plan stream ended early after {len(days) + len(malformed)} days")
+        unterminated = parser.remainder()
+        if unterminated:
+            malformed.append((len(days) + len(malformed) + 1, unterminated))
+    
+    for position, raw_day in malformed:
+        print(f"🔧 Repairing malformed KT day {position}")
+        day_plan = await repair_day(raw_day, position, context, role)
+        days.append(day_plan)
+        if on_day:
+            on_day(day_plan)
+    
+    return await complete_plan({"plan": days}, context, role, on_day)
+
+async def complete_plan(
+    plan: Dict,
+    context: str,
+    role: str,
+    on_day: Optional[Callable[[Dict], None]] = None
+) -> Dict:
+    """
+    Generate the days of a KT_PLAN_DAYS-day plan that the answer left out
+    (e.g. cut off at KT_MAX_TOKENS), so a short plan is never saved as complete
+    """
+    
+    days = [day_plan for day_plan in plan.get('plan', []) if isinstance(day_plan, dict)]
+    present = {day_plan.get('day') for day_plan in days}
+    
+    for day_number in range(1, KT_PLAN_DAYS + 1):
+        if day_number in present:
+            continue
+        print(f"🔧 Generating missing KT day {day_number}")
+        day_plan = await generate_day(day_number, days, context, role)
+        days.append(day_plan)
+        if on_day:
+            on_day(day_plan)
+    
+    days.sort(key=lambda day_plan: day_plan.get('day', 0))
+    return {**plan, "plan": days}
+
+async def repair_day(raw_day: str, position: int, context: str, role: str) -> Dict:
+    """Regenerate one malformed day of the plan as a standalone JSON object"""
+    
+    match = re.search(r'"day"\s*:\s*(\d+)', raw_day)
+    day_number = int(match.group(1)) if match else position
+    
+    prompt = f"""You are an expert engineering onboarding specialist. Day {day_number} of a Knowledge Transfer plan for a new {role} developer came back as malformed JSON.
+
+Project Information:
+{context}
+
+Malformed day:
+{raw_day[:4000]}
+
+Return only day {day_number} as a valid JSON object with the keys "day", "title", "focus", "files_to_study", "concepts", "exercise" and "checkpoint_questions".
+"""
+    
+    return await request_day(prompt, day_number, "repair")
+
+async def generate_day(day_number: int, days: List[Dict], context: str, role: str) -> Dict:
+    """Write one day missing from the plan, around the days it already has"""
+    
+    outline = '\n'.join(
+        f"Day {day_plan.get('day')}: {day_plan.get('title', '')}"
+        for day_plan in sorted(days, key=lambda day_plan: day_plan.get('day', 0))
+    )
     
-    prompt = f"""You are an expert engineering onboarding specialist. Create a detailed 10-day Knowledge Transfer plan for a new {role} developer joining this project.
+    prompt = f"""You are an expert engineering onboarding specialist writing a {KT_PLAN_DAYS}-day Knowledge Transfer plan for a new {role} developer. Day {day_number} is missing.
+
+Project Information:
+{context}
+
+Days already planned:
+{outline or "(none)"}
+
+Return only day {day_number} as a valid JSON object with the keys "day", "title", "focus", "files_to_study", "concepts", "exercise" and "checkpoint_questions". Don't repeat the other days' material.
+"""
+    
+    return await request_day(prompt, day_number, "generate")
+
+async def request_day(prompt: str, day_number: int, action: str) -> Dict:
+    """Ask for a single day as JSON, retrying malformed answers"""
+    
+    for attempt in range(KT_DAY_REPAIR_ATTEMPTS):
+        response_text = await chat(
+            prompt,
+            KT_DAY_MAX_TOKENS,
+            # A cached malformed answer would fail the same way again
+            use_cache=attempt == 0,
+            response_format={"type": "json_object"}
+        )
+        day_plan = parse_day(response_text)
+        if day_plan is not None:
+            day_plan['day'] = day_number
+            return day_plan
+    
+    raise ValueError(f"Failed to {action} day {day_number} of the KT plan")
+
+def parse_day(raw_day: str) -> Optional[Dict]:
+    """Parse one day object, or None if it isn't a valid day"""
+    
+    try:
+        day_plan = json.loads(raw_day)
+    except json.JSONDecodeError:
+        return None
+    
+    if not isinstance(day_plan, dict) or not isinstance(day_plan.get('day'), int):
+        return None
+    return day_plan
+
+class PlanStreamParser:
+    """
+    Incrementally extracts the objects of the "plan" array from a streamed
+    {"plan": [...]} document, returning each one as soon as it closes
+    """
+    
+    def __init__(self):
+        self.buffer = ''
+        self.found_plan = False
+        self._pos = 0
+        self._depth = 0
+        self._start = 0
+        self._in_string = False
+        self._escaped = False
+        self.done = False
+    
+    def feed(self, text: str) -> List[str]:
+        """Add streamed text; returns the raw JSON of any days completed by it"""
+        
+        self.buffer += text
+        completed = []
+        
+        if not self.found_plan:
+            match = re.search(r'"plan"\s*:\s*\[', self.buffer)
+            if not match:
+                return completed
+            self.found_plan = True
+            self._pos = match.end()
+        
+        while self._pos < len(self.buffer) and not self.done:
+            char = self.buffer[self._pos]
+            
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == '{':
+                if self._depth == 0:
+                    self._start = self._pos
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    completed.append(self.buffer[self._start:self._pos + 1])
+            elif char == ']' and self._depth == 0:
+                self.done = True
+            
+            self._pos += 1
+        
+        return completed
+    
+    def remainder(self) -> str:
+        """Raw text of a day the stream ended inside, or '' if it ended between days"""
+        
+        if self._depth > 0:
+            return self.buffer[self._start:]
+        return ''
+
+def build_kt_prompt(context: str, role: str) -> str:
+    """KT plan prompt around the prepared project context"""
+    
+    return f"""You are an expert engineering onboarding specialist. Create a detailed {KT_PLAN_DAYS}-day Knowledge Transfer plan for a new {role} developer joining this project.
 
 Project Information:
 {context}
@@ -41,17 +289,10 @@ Format as JSON:
 }}
 """
 
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        max_tokens=3000,
-        messages=[{"role": "user", "content": prompt}]
-    )
-
-    import json
-    import re
-
+def parse_kt_response(response_text: str) -> Dict:
+    """Extract the plan JSON from a free-form response"""
+    
     # Extract JSON from OpenAI's response (handle markdown code blocks)
-    response_text = response.choices[0].message.content
 
     # Try to find JSON in code blocks first
     json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', response_text, re.DOTALL)
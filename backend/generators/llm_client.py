@@ -0,0 +1,339 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, Dict, Optional, Tuple, TypeVar
+
+from dotenv import load_dotenv
+
+from cache_store import SQLiteCache
+
+# The SDK is imported on first use (see _get_client): it is a large part
+# of server startup, and most requests never call the API
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+# Load environment variables
+load_dotenv()
+
+LLM_MODEL = os.environ.get("OPENAI_MODEL", "gpt-4o")
+
+# Point at a local stub server (any OpenAI-compatible endpoint) for testing
+LLM_BASE_URL = os.environ.get("OPENAI_BASE_URL") or None
+
+# Requests in flight across the whole process, and pooled HTTP connections
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_CONNECTIONS = int(os.environ.get("LLM_MAX_CONNECTIONS", "20"))
+
+# Retries on 429 / 5xx / connection errors, with exponential backoff + jitter
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE = float(os.environ.get("LLM_BACKOFF_BASE", "1.0"))
+LLM_BACKOFF_MAX = float(os.environ.get("LLM_BACKOFF_MAX", "30.0"))
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", "120"))
+
+# Persistent cache of completions keyed by hash(model, prompt, params)
+LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_PATH = Path(os.environ.get("LLM_CACHE_PATH", "./data/llm_cache.db"))
+LLM_CACHE_TTL_HOURS = float(os.environ.get("LLM_CACHE_TTL_HOURS", "168"))
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "10000"))
+LLM_CACHE_MAX_MB = int(os.environ.get("LLM_CACHE_MAX_MB", "256"))
+
+T = TypeVar("T")
+
+# All LLM I/O runs on one background event loop, so every job thread shares
+# the same connection pool and concurrency limit
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_client: Optional["AsyncOpenAI"] = None
+_retryable_errors: Tuple[type, ...] = ()
+_semaphore: Optional[asyncio.Semaphore] = None
+_cache: Optional[SQLiteCache] = None
+_inflight: Dict[str, asyncio.Future] = {}
+# Result of an in-flight request whose caller was cancelled
+_ABANDONED = object()
+_init_lock = threading.Lock()
+
+
+async def chat(prompt: str, max_tokens: int, use_cache: bool = True, **params) -> str:
+    """
+    Run one chat completion on the shared client; identical requests are
+    answered from the response cache, and identical requests already in
+    flight share a single API call
+    Returns: the completion text
+    """
+
+    cache = get_response_cache() if use_cache else None
+    if not cache:
+        text, _ = await _complete(prompt, max_tokens, **params)
+        return text
+
+    key = prompt_fingerprint(prompt, max_tokens, **params)
+
+    while True:
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None:
+            return cached
+
+        if key in _inflight:
+            text = await asyncio.shield(_inflight[key])
+            if text is _ABANDONED:
+                # The caller making the request was cancelled; make it ourselves
+                continue
+            return text
+
+        future = asyncio.get_running_loop().create_future()
+        _inflight[key] = future
+        try:
+            text, finish_reason = await _complete(prompt, max_tokens, **params)
+            # A response cut off at max_tokens would come back cut off on every retry
+            if text is not None and finish_reason != "length":
+                await asyncio.to_thread(cache.set, key, text)
+            future.set_result(text)
+            return text
+        except asyncio.CancelledError:
+            # Only this caller gave up: waiters retry rather than fail with it
+            future.set_result(_ABANDONED)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Waiters re-raise it; mark it retrieved in case there were none
+            future.exception()
+            raise
+        finally:
+            del _inflight[key]
+
+
+async def chat_stream(prompt: str, max_tokens: int, use_cache: bool = True, **params) -> AsyncIterator[str]:
+    """
+    Stream one chat completion as text deltas. A cached response is yielded
+    as a single delta; a streamed response is cached once it completes,
+    unless it was cut off at max_tokens.
+    """
+
+    cache = get_response_cache() if use_cache else None
+    key = prompt_fingerprint(prompt, max_tokens, **params)
+
+    if cache:
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None:
+            yield cached
+            return
+
+    parts = []
+    finish_reason = None
+    async for delta, reason in _stream(prompt, max_tokens, **params):
+        if delta:
+            parts.append(delta)
+            yield delta
+        finish_reason = reason or finish_reason
+
+    if finish_reason == "length":
+        print(f"⚠️ LLM stream stopped at max_tokens ({max_tokens}); not caching it")
+    elif cache:
+        await asyncio.to_thread(cache.set, key, ''.join(parts))
+
+
+async def relay_chat_stream(prompt: str, max_tokens: int, **params) -> AsyncIterator[str]:
+    """
+    chat_stream for code running on another event loop (e.g. a request
+    handler): the completion runs on the shared LLM loop, and its deltas are
+    relayed through a queue on the caller's loop. Closing the iterator
+    early cancels the completion.
+    """
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    finished = object()
+
+    def put(item):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            # Caller's loop already closed
+            pass
+
+    async def produce():
+        try:
+            async for delta in chat_stream(prompt, max_tokens, **params):
+                put(delta)
+        except Exception as e:
+            put(e)
+        else:
+            put(finished)
+
+    future = asyncio.run_coroutine_threadsafe(produce(), get_loop())
+    try:
+        while True:
+            item = await queue.get()
+            if item is finished:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        future.cancel()
+
+
+def prompt_fingerprint(prompt: str, max_tokens: int, **params) -> str:
+    """Stable cache key for a request: hash of model, prompt and parameters"""
+
+    request = {
+        "model": LLM_MODEL,
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": max_tokens,
+        **params
+    }
+    return hashlib.sha256(json.dumps(request, sort_keys=True).encode()).hexdigest()
+
+
+def get_response_cache() -> Optional[SQLiteCache]:
+    """Shared LLM response cache, or None when disabled"""
+
+    global _cache
+
+    if not LLM_CACHE_ENABLED:
+        return None
+
+    with _init_lock:
+        if _cache is None:
+            _cache = SQLiteCache(
+                LLM_CACHE_PATH,
+                max_entries=LLM_CACHE_MAX_ENTRIES,
+                max_bytes=LLM_CACHE_MAX_MB * 1024 * 1024,
+                ttl_seconds=LLM_CACHE_TTL_HOURS * 3600
+            )
+        return _cache
+
+
+async def _complete(prompt: str, max_tokens: int, **params) -> Tuple[str, Optional[str]]:
+    """
+    Call the API, retrying rate limits and transient failures
+    Returns: (completion text, finish reason)
+    """
+
+    client, semaphore = _get_client()
+
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            async with semaphore:
+                response = await client.chat.completions.create(
+                    model=LLM_MODEL,
+                    max_tokens=max_tokens,
+                    messages=[{"role": "user", "content": prompt}],
+                    **params
+                )
+            choice = response.choices[0]
+            return choice.message.content, choice.finish_reason
+
+        except _retryable_errors as e:
+            if attempt == LLM_MAX_RETRIES:
+                raise
+            delay = backoff_delay(attempt, e)
+            print(f"⏳ LLM request failed ({type(e).__name__}), retrying in {delay:.1f}s")
+            # Sleep outside the semaphore so other requests can use the slot
+            await asyncio.sleep(delay)
+
+
+async def _stream(prompt: str, max_tokens: int, **params) -> AsyncIterator[Tuple[str, Optional[str]]]:
+    """
+    Stream (text delta, finish reason) pairs from the API; the finish reason
+    arrives with the last chunk. Failures are only retried before the first delta.
+    """
+
+    client, semaphore = _get_client()
+
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        started = False
+        try:
+            async with semaphore:
+                stream = await client.chat.completions.create(
+                    model=LLM_MODEL,
+                    max_tokens=max_tokens,
+                    messages=[{"role": "user", "content": prompt}],
+                    stream=True,
+                    **params
+                )
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    choice = chunk.choices[0]
+                    if choice.delta.content or choice.finish_reason:
+                        started = started or bool(choice.delta.content)
+                        yield choice.delta.content or '', choice.finish_reason
+            return
+
+        except _retryable_errors as e:
+            if started or attempt == LLM_MAX_RETRIES:
+                raise
+            delay = backoff_delay(attempt, e)
+            print(f"⏳ LLM stream failed ({type(e).__name__}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+def run(coro: Awaitable[T]) -> T:
+    """Run a coroutine on the shared LLM loop from synchronous code and wait for it"""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Background event loop for LLM calls, started on first use"""
+
+    global _loop
+
+    with _init_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=loop.run_forever,
+                name="llm-loop",
+                daemon=True
+            ).start()
+            _loop = loop
+        return _loop
+
+
+def backoff_delay(attempt: int, error: Exception) -> float:
+    """Seconds to wait before retry `attempt + 1`, honoring Retry-After when sent"""
+
+    from openai import APIStatusError
+
+    if isinstance(error, APIStatusError):
+        retry_after = error.response.headers.get("retry-after")
+        try:
+            return min(float(retry_after), LLM_BACKOFF_MAX)
+        except (TypeError, ValueError):
+            pass
+
+    delay = min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt))
+    return delay * (0.5 + random.random() / 2)
+
+
+def _get_client():
+    """Client and semaphore, created lazily on the LLM loop"""
+
+    global _client, _semaphore, _retryable_errors
+
+    if _client is None:
+        import httpx
+        from openai import AsyncOpenAI, APIConnectionError, InternalServerError, RateLimitError
+
+        _retryable_errors = (RateLimitError, InternalServerError, APIConnectionError)
+        _client = AsyncOpenAI(
+            api_key=os.environ.get("OPENAI_API_KEY"),
+            base_url=LLM_BASE_URL,
+            timeout=LLM_TIMEOUT,
+            # Retries are handled in _complete() so they don't hold a concurrency slot
+            max_retries=0,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_MAX_CONNECTIONS
+                ),
+                timeout=LLM_TIMEOUT
+            )
+        )
+        _semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+    return _client, _semaphore
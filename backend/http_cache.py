@@ -0,0 +1,328 @@
+import gzip
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+
+from database import get_db_connection, on_commit
+
+# Brotli is optional; without it compressed responses fall back to gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# In-process LRU of serialized read responses
+RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE_ENABLED", "1") == "1"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+RESPONSE_CACHE_MAX_MB = int(os.environ.get("RESPONSE_CACHE_MAX_MB", "64"))
+
+# Bodies smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "500"))
+
+# Seconds a browser may reuse a response before revalidating with its ETag
+HTTP_CACHE_MAX_AGE = int(os.environ.get("HTTP_CACHE_MAX_AGE", "0"))
+
+# Seconds a project's version is served from memory before re-reading it
+# (bumps in this process apply at once; this only bounds how long writes
+# from other processes, e.g. the migrations CLI, go unseen)
+VERSION_CACHE_SECONDS = float(os.environ.get("VERSION_CACHE_SECONDS", "5"))
+
+# Version key of the project listing (bumped with any project)
+ALL_PROJECTS = "*"
+
+# Version key bumped when every project changes at once (e.g. a backfill);
+# seeded with a random value so ETags never carry over to a new database
+EPOCH = "#epoch"
+
+
+class ResponseCache:
+    """
+    LRU of serialized JSON bodies keyed by (project, URL, project version),
+    with their gzip/brotli encodings computed once on first request.
+    Entries of a project are dropped when its version is bumped.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._bytes = 0
+        self._entries: "OrderedDict[tuple, Dict[str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[Dict[str, bytes]]:
+        """Encodings of a cached body ("identity" always present), or None"""
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: tuple, body: bytes) -> Dict[str, bytes]:
+        """Store a body and return its (for now identity-only) encodings"""
+
+        entry = {"identity": body}
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = entry
+            self._bytes += len(body)
+            self._evict()
+        return entry
+
+    def add_encoding(self, key: tuple, entry: Dict[str, bytes], encoding: str, body: bytes):
+        """Remember a compressed variant so it is only computed once"""
+
+        with self._lock:
+            if self._entries.get(key) is entry and encoding not in entry:
+                entry[encoding] = body
+                self._bytes += len(body)
+                self._evict()
+
+    def invalidate(self, project_id: str):
+        """Drop every cached response of a project"""
+
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == project_id]:
+                self._discard(key)
+
+    def clear(self):
+        """Remove every entry"""
+
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._bytes
+            }
+
+    def _discard(self, key: tuple):
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._bytes -= sum(len(body) for body in entry.values())
+
+    def _evict(self):
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            self._discard(next(iter(self._entries)))
+
+
+_cache = ResponseCache(RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_MAX_MB * 1024 * 1024)
+
+# Project versions read from the database: project id -> (version, expires at).
+# The generation changes with every committed bump, so a read that raced
+# one isn't cached.
+_versions: Dict[str, tuple] = {}
+_versions_generation = 0
+_versions_lock = threading.Lock()
+
+
+def get_http_response_cache() -> Optional[ResponseCache]:
+    """Shared serialized-response cache, or None when disabled"""
+    return _cache if RESPONSE_CACHE_ENABLED else None
+
+
+def project_version(project_id: str) -> str:
+    """
+    Current version of a project's stored data. Versions live in the
+    database, so writes from other processes (workers, the migrations CLI)
+    are seen too; see cached_version for the in-memory copy.
+    """
+
+    version = cached_version(project_id)
+    if version is not None:
+        return version
+
+    with _versions_lock:
+        generation = _versions_generation
+    with get_db_connection() as conn:
+        rows = conn.execute(
+            "SELECT key, version FROM cache_versions WHERE key IN (?, ?)",
+            (EPOCH, project_id)
+        ).fetchall()
+
+    versions = {row['key']: row['version'] for row in rows}
+    version = f"{versions.get(EPOCH, 0):x}.{versions.get(project_id, 0)}"
+    with _versions_lock:
+        # A bump committed while we read may not be in `rows`: don't keep it
+        if generation == _versions_generation:
+            _versions[project_id] = (version, time.monotonic() + VERSION_CACHE_SECONDS)
+    return version
+
+
+def cached_version(project_id: str) -> Optional[str]:
+    """A project's version from memory, or None when it has to be read"""
+
+    with _versions_lock:
+        cached = _versions.get(project_id)
+    if cached and cached[1] > time.monotonic():
+        return cached[0]
+    return None
+
+
+def _forget_versions(keys):
+    """Drop in-memory versions once a bump of `keys` has committed"""
+
+    global _versions_generation
+    with _versions_lock:
+        _versions_generation += 1
+        if EPOCH in keys:
+            _versions.clear()
+        for key in keys:
+            _versions.pop(key, None)
+
+
+def bump_version(*project_ids: str):
+    """
+    Mark projects as changed: their ETags stop matching and their cached
+    responses are dropped. Call inside the write's get_db_connection()
+    block, so the bump commits (or rolls back) with the data.
+    """
+
+    _bump(project_ids)
+    for project_id in project_ids:
+        _cache.invalidate(project_id)
+
+
+def bump_all():
+    """Mark every project as changed (e.g. in a data backfill's transaction)"""
+
+    _bump([EPOCH])
+    _cache.clear()
+
+
+def _bump(keys):
+    with get_db_connection() as conn:
+        conn.executemany("""
+            INSERT INTO cache_versions (key, version) VALUES (?, 1)
+            ON CONFLICT (key) DO UPDATE SET version = version + 1
+        """, [(key,) for key in keys])
+    # Readers see the new version once it commits
+    on_commit(lambda: _forget_versions(keys))
+
+
+def etag_for(version: str) -> str:
+    # Weak: the same version is served under several content encodings
+    return f'W/"{version}"'
+
+
+def cache_headers(version: str) -> Dict[str, str]:
+    """ETag and Cache-Control for a response of the given project version"""
+
+    return {
+        "ETag": etag_for(version),
+        "Cache-Control": f"private, max-age={HTTP_CACHE_MAX_AGE}, must-revalidate",
+        "Vary": "Accept-Encoding"
+    }
+
+
+def not_modified(request: Request, version: str) -> Optional[Response]:
+    """A 304 response when the client already holds this version, else None"""
+
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+
+    etag = etag_for(version)
+    candidates = [value.strip() for value in header.split(",")]
+    # Weak comparison, as If-None-Match requires
+    if "*" in candidates or any(value.removeprefix("W/") == etag.removeprefix("W/") for value in candidates):
+        return Response(status_code=304, headers=cache_headers(version))
+    return None
+
+
+async def cached_json(request: Request, project_id: str, build: Callable[[], Any]) -> Response:
+    """
+    Serve a read endpoint whose body only changes when `project_id`'s version
+    does: 304 on a matching If-None-Match, otherwise the serialized body from
+    the LRU (built with `build()` on a miss), compressed per Accept-Encoding.
+    Versions are usually in memory; a version read and `build()` query
+    SQLite, so they run in the threadpool.
+    """
+
+    # Read before building: a body newer than its version is only a wasted
+    # cache entry, an older one would be served as current
+    version = cached_version(project_id) or await run_in_threadpool(project_version, project_id)
+
+    response = not_modified(request, version)
+    if response:
+        return response
+
+    cache = get_http_response_cache()
+    key = (project_id, request.url.path, tuple(sorted(request.query_params.multi_items())), version)
+
+    entry = cache.get(key) if cache else None
+    if entry is None:
+        # HTTPExceptions raised by build() propagate and are never cached
+        body = json.dumps(jsonable_encoder(await run_in_threadpool(build)), separators=(",", ":")).encode()
+        entry = cache.put(key, body) if cache else {"identity": body}
+
+    encoding = choose_encoding(request.headers.get("accept-encoding", ""), len(entry["identity"]))
+    if encoding not in entry:
+        compressed = compress(entry["identity"], encoding)
+        if cache:
+            cache.add_encoding(key, entry, encoding, compressed)
+        else:
+            entry[encoding] = compressed
+
+    headers = cache_headers(version)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+
+    return Response(entry[encoding], media_type="application/json", headers=headers)
+
+
+def choose_encoding(accept_encoding: str, size: int) -> str:
+    """Brotli when available and accepted, then gzip, else identity (q=0 refuses an encoding)"""
+
+    if size < COMPRESS_MIN_BYTES:
+        return "identity"
+
+    accepted, refused = set(), set()
+    for value in accept_encoding.lower().split(","):
+        coding, *params = [part.strip() for part in value.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, number = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(number)
+                except ValueError:
+                    quality = 0.0
+        (accepted if quality > 0 else refused).add(coding)
+
+    def acceptable(coding: str) -> bool:
+        # "*" covers codings not listed on their own
+        return coding in accepted or ("*" in accepted and coding not in refused)
+
+    if brotli and acceptable("br"):
+        return "br"
+    if acceptable("gzip"):
+        return "gzip"
+    return "identity"
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body)
+    return gzip.compress(body, compresslevel=6)
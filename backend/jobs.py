@@ -0,0 +1,293 @@
+import asyncio
+import os
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+# Number of analyses that may run at the same time in this process
+MAX_CONCURRENT_JOBS = int(os.environ.get("MAX_CONCURRENT_JOBS", "4"))
+
+# Finished jobs kept in memory for status polling
+MAX_JOB_HISTORY = int(os.environ.get("MAX_JOB_HISTORY", "500"))
+
+# Progress events kept per job so late subscribers can replay them
+MAX_JOB_EVENTS = int(os.environ.get("MAX_JOB_EVENTS", "20000"))
+
+# Seconds between keepalive comments on an idle event stream
+EVENT_KEEPALIVE_SECONDS = 15
+
+# Pipeline stages, in execution order
+STAGES = ["fetch", "scan", "analyze", "documentation", "kt_plan", "save", "index"]
+
+# Events after which a job's stream ends
+TERMINAL_EVENTS = {"completed", "failed"}
+
+# Live-only events: streamed tokens are dropped from a finished job's
+# history, and of running counters only the latest value is kept
+TRANSIENT_EVENTS = {"token"}
+COUNTER_EVENTS = {"progress", "index_progress"}
+
+_jobs: Dict[str, Dict] = {}
+_events: Dict[str, deque] = {}
+_subscribers: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+_lock = threading.Lock()
+_executor = ThreadPoolExecutor(
+    max_workers=MAX_CONCURRENT_JOBS,
+    thread_name_prefix="kt-job"
+)
+
+
+def create_job(kind: str, source: str, role: str, stages: List[str] = STAGES) -> str:
+    """
+    Register a new queued job
+    Returns: job_id
+    """
+
+    job_id = str(uuid.uuid4())
+
+    with _lock:
+        _jobs[job_id] = {
+            "id": job_id,
+            "kind": kind,
+            "source": source,
+            "role": role,
+            "status": "queued",
+            "stages": {stage: {"status": "pending"} for stage in stages},
+            "partial": {},
+            "project_id": None,
+            "files_analyzed": 0,
+            "error": None,
+            "created_at": _now(),
+            "finished_at": None
+        }
+        _events[job_id] = deque(maxlen=MAX_JOB_EVENTS)
+        _prune_history()
+
+    return job_id
+
+
+def submit_job(job_id: str, runner: Callable, *args) -> None:
+    """Run `runner(job_id, *args)` on the bounded worker pool"""
+
+    def _run():
+        with _lock:
+            _jobs[job_id]["status"] = "running"
+        try:
+            runner(job_id, *args)
+        except Exception as e:
+            print(f"❌ Job {job_id} failed: {str(e)}")
+            fail_job(job_id, str(e))
+
+    _executor.submit(_run)
+
+
+def start_stage(job_id: str, stage: str) -> None:
+    """Mark a stage as running"""
+
+    with _lock:
+        _jobs[job_id]["stages"][stage] = {
+            "status": "running",
+            "started_at": _now()
+        }
+        _publish(job_id, "stage", {"stage": stage, "status": "running"})
+
+
+def complete_stage(job_id: str, stage: str, **details) -> None:
+    """Mark a stage as completed, attaching any extra details (counts etc.)"""
+
+    with _lock:
+        stage_info = _jobs[job_id]["stages"][stage]
+        stage_info.update(details)
+        stage_info["status"] = "completed"
+        stage_info["finished_at"] = _now()
+        _publish(job_id, "stage", {"stage": stage, "status": "completed", **details})
+
+
+def skip_stage(job_id: str, stage: str, reason: str) -> None:
+    """Mark a stage as skipped (e.g. nothing changed since the last analysis)"""
+
+    with _lock:
+        _jobs[job_id]["stages"][stage] = {
+            "status": "skipped",
+            "reason": reason
+        }
+        _publish(job_id, "stage", {"stage": stage, "status": "skipped", "reason": reason})
+
+
+def add_partial_result(job_id: str, key: str, item) -> None:
+    """Append an intermediate result (e.g. a KT day) visible before its stage completes"""
+
+    with _lock:
+        _jobs[job_id]["partial"].setdefault(key, []).append(item)
+        _publish(job_id, key, item)
+
+
+def publish_event(job_id: str, event: str, data: Dict) -> None:
+    """Send a progress event (counters, streamed tokens) to the job's subscribers"""
+
+    with _lock:
+        _publish(job_id, event, data)
+
+
+def complete_job(job_id: str, project_id: str, files_analyzed: int) -> None:
+    """Mark the whole job as completed"""
+
+    with _lock:
+        job = _jobs[job_id]
+        job["status"] = "completed"
+        job["project_id"] = project_id
+        job["files_analyzed"] = files_analyzed
+        job["finished_at"] = _now()
+        _publish(job_id, "completed", {"project_id": project_id, "files_analyzed": files_analyzed})
+        _compact_events(job_id)
+
+
+def fail_job(job_id: str, error: str) -> None:
+    """Mark the job (and whichever stage was running) as failed"""
+
+    with _lock:
+        job = _jobs[job_id]
+        for stage, stage_info in job["stages"].items():
+            if stage_info["status"] == "running":
+                stage_info["status"] = "failed"
+                stage_info["finished_at"] = _now()
+                _publish(job_id, "stage", {"stage": stage, "status": "failed"})
+        job["status"] = "failed"
+        job["error"] = error
+        job["finished_at"] = _now()
+        _publish(job_id, "failed", {"error": error})
+        _compact_events(job_id)
+
+
+def get_job(job_id: str) -> Optional[Dict]:
+    """Get a snapshot of a job's state"""
+
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        snapshot = dict(job)
+        snapshot["stages"] = {
+            stage: dict(info) for stage, info in job["stages"].items()
+        }
+        snapshot["partial"] = {
+            key: list(items) for key, items in job["partial"].items()
+        }
+        return snapshot
+
+
+async def stream_events(job_id: str, after_id: int = 0) -> AsyncIterator[Optional[Dict]]:
+    """
+    Yield a job's events with id > `after_id`: first the recorded history,
+    then live events until the job completes or fails. Yields None after
+    EVENT_KEEPALIVE_SECONDS without events so callers can send a keepalive.
+    Ends at once if the job has since been pruned from the history.
+    """
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    subscriber = (loop, queue)
+
+    # Snapshot history and subscribe atomically so no event falls in between
+    with _lock:
+        history = [event for event in _events.get(job_id, []) if event["id"] > after_id]
+        job = _jobs.get(job_id)
+        # Only finished jobs are pruned, so a missing one has nothing left to send
+        finished = job is None or job["status"] in ("completed", "failed")
+        if not finished:
+            _subscribers.setdefault(job_id, []).append(subscriber)
+
+    try:
+        for event in history:
+            yield event
+            after_id = event["id"]
+
+        if finished:
+            return
+
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), EVENT_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+
+            if event["id"] <= after_id:
+                continue
+            yield event
+            if event["event"] in TERMINAL_EVENTS:
+                return
+    finally:
+        with _lock:
+            subscribers = _subscribers.get(job_id, [])
+            if subscriber in subscribers:
+                subscribers.remove(subscriber)
+            if not subscribers:
+                _subscribers.pop(job_id, None)
+
+
+def _publish(job_id: str, event: str, data) -> None:
+    """Record an event and hand it to live subscribers (caller holds _lock)"""
+
+    events = _events.setdefault(job_id, deque(maxlen=MAX_JOB_EVENTS))
+    record = {
+        "id": events[-1]["id"] + 1 if events else 1,
+        "event": event,
+        "data": data
+    }
+
+    # Replay history is bounded by the deque; live subscribers still get every event
+    events.append(record)
+
+    for loop, queue in _subscribers.get(job_id, []):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, record)
+        except RuntimeError:
+            # Subscriber's event loop already closed
+            pass
+
+
+def _compact_events(job_id: str) -> None:
+    """
+    Shrink a finished job's replay history to stage, partial-result and
+    terminal events plus the last value of each counter (caller holds _lock).
+    Event ids are kept, so resuming with Last-Event-ID still works.
+    """
+
+    events = _events.get(job_id)
+    if not events:
+        return
+
+    latest = {}
+    for record in events:
+        if record["event"] in COUNTER_EVENTS:
+            latest[record["event"]] = record["id"]
+
+    _events[job_id] = deque(
+        (
+            record for record in events
+            if record["event"] not in TRANSIENT_EVENTS
+            and (record["event"] not in COUNTER_EVENTS or latest[record["event"]] == record["id"])
+        ),
+        maxlen=MAX_JOB_EVENTS
+    )
+
+
+def _prune_history() -> None:
+    """Drop the oldest finished jobs once history exceeds MAX_JOB_HISTORY"""
+
+    finished = [
+        job_id for job_id, job in _jobs.items()
+        if job["status"] in ("completed", "failed")
+    ]
+    overflow = len(_jobs) - MAX_JOB_HISTORY
+    for job_id in finished[:max(overflow, 0)]:
+        del _jobs[job_id]
+        _events.pop(job_id, None)
+
+
+def _now() -> str:
+    return datetime.now().isoformat()
@@ -1,28 +1,50 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, UploadFile, File, Header, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
+import json
 import os
-import shutil
 import tempfile
-import zipfile
 from pathlib import Path
-from typing import List
-import subprocess
-from models import ProjectResponse
+from models import JobResponse, ChatRequest
+from database import init_database
 from curd import (
-    save_to_db, 
-    get_project, 
-    get_documentation, 
+    get_project,
+    get_documentation_outline,
+    get_documentation_section,
+    iter_documentation_sections,
     get_kt_plan,
-    get_files,
+    list_files,
+    list_projects,
+    search_symbols,
     get_user_progress,
     update_progress,
-    get_all_projects
+    get_storage_stats
 )
-from generators.doc_generator import generate_documentation
-from generators.kt_generator import create_kt_plan
-from analyzer.python_analyzer import analyze_python_file
+from http_cache import (
+    cached_json,
+    not_modified,
+    cache_headers,
+    project_version,
+    cached_version,
+    get_http_response_cache,
+    ALL_PROJECTS,
+    COMPRESS_MIN_BYTES
+)
+from jobs import create_job, submit_job, get_job, stream_events
+from pipeline import run_upload_job, run_github_job, run_update_job, cleanup
+from repo_mirror import valid_branch_name
 # ... (keep all previous imports)
 
+# Uploads are copied to disk in chunks of this size instead of read whole
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_MB = int(os.environ.get("MAX_UPLOAD_MB", "1024"))
+
+# Upper bound on ?limit= for symbol search and paginated listings
+SYMBOL_SEARCH_MAX_LIMIT = 200
+MAX_PAGE_SIZE = 1000
+
 app = FastAPI(title="Code KT Generator API", version="2.0.0")
 app.add_middleware(
     CORSMiddleware,
@@ -31,198 +53,387 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Cached read endpoints arrive pre-compressed (Content-Encoding set), which
+# this middleware leaves alone; it compresses the remaining JSON responses
+app.add_middleware(GZipMiddleware, minimum_size=COMPRESS_MIN_BYTES)
+
+# Initialize database on startup
+@app.on_event("startup")
+async def startup_event():
+    init_database()
+    print("🚀 Server started successfully!")
 
 # ... (keep previous code: startup, CORS, etc.)
 
 # NEW ENDPOINTS
 
-@app.post("/api/analyze/upload", response_model=ProjectResponse)
+@app.post("/api/analyze/upload", response_model=JobResponse, status_code=202)
 async def analyze_uploaded_project(
     file: UploadFile = File(...),
     role: str = "fullstack"
 ):
-    """Analyze project from uploaded ZIP file"""
+    """Queue analysis of an uploaded ZIP file, returns a job to poll"""
     
     # Validate file type
     if not file.filename.endswith('.zip'):
         raise HTTPException(status_code=400, detail="Only ZIP files are supported")
     
-    # Create temporary directory
+    # Create temporary directory (removed by the job when it finishes)
     temp_dir = tempfile.mkdtemp()
     
+    print(f"📦 Processing uploaded file: {file.filename}")
+    
+    # Stream uploaded file to disk
+    zip_path = Path(temp_dir) / Path(file.filename).name
+    size = 0
     try:
-        print(f"📦 Processing uploaded file: {file.filename}")
-        
-        # Save uploaded file
-        zip_path = Path(temp_dir) / file.filename
         with open(zip_path, 'wb') as f:
-            content = await file.read()
-            f.write(content)
-        
-        print(f"✅ File saved: {zip_path}")
-        
-        # Extract ZIP
-        extract_dir = Path(temp_dir) / "project"
-        extract_dir.mkdir()
-        
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(extract_dir)
-        
-        print(f"✅ ZIP extracted to: {extract_dir}")
-        
-        # Find the actual project root (skip __MACOSX, .DS_Store, etc.)
-        project_root = find_project_root(extract_dir)
-        
-        # Analyze the project (reuse existing logic)
-        files = scan_project_files(project_root)
-        
-        if not files:
-            raise HTTPException(status_code=400, detail="No supported code files found in ZIP")
-        
-        print(f"✅ Found {len(files)} files")
-        
-        # Analyze files
-        analyzed_data = []
-        for file_path in files:
-            analysis = analyze_file(file_path)
-            if analysis:
-                analyzed_data.append(analysis)
-        
-        print(f"✅ Analyzed {len(analyzed_data)} files")
-        
-        # Generate documentation
-        documentation = generate_documentation(analyzed_data, role)
-        print("✅ Documentation generated")
-        
-        # Create KT plan
-        kt_plan = create_kt_plan(analyzed_data, role)
-        print("✅ KT plan created")
-        
-        # Save to database
-        project_id = save_to_db(
-            file.filename,  # Store original filename
-            analyzed_data, 
-            documentation, 
-            kt_plan,
-            role
-        )
-        
-        return ProjectResponse(
-            project_id=project_id,
-            files_analyzed=len(analyzed_data),
-            status="completed"
-        )
-    
-    except Exception as e:
-        print(f"❌ Error: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
-    
-    finally:
-        # Cleanup temporary files
-        try:
-            shutil.rmtree(temp_dir)
-            print("🧹 Cleaned up temporary files")
-        except:
-            pass
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > MAX_UPLOAD_MB * 1024 * 1024:
+                    raise HTTPException(status_code=413, detail=f"ZIP file exceeds {MAX_UPLOAD_MB} MB")
+                f.write(chunk)
+    except Exception:
+        cleanup(temp_dir)
+        raise
+    
+    print(f"✅ File saved: {zip_path} ({size // 1024} KB)")
+    
+    job_id = create_job("upload", file.filename, role)
+    submit_job(job_id, run_upload_job, zip_path, file.filename, role, temp_dir)
+    
+    return JobResponse(job_id=job_id, status="queued")
 
 
-@app.post("/api/analyze/github", response_model=ProjectResponse)
+@app.post("/api/analyze/github", response_model=JobResponse, status_code=202)
 async def analyze_github_repo(
     repo_url: str,
     role: str = "fullstack",
     branch: str = "main"
 ):
-    """Analyze project from GitHub repository"""
+    """Queue analysis of a GitHub repository, returns a job to poll"""
     
     # Validate GitHub URL
     if not ("github.com" in repo_url):
         raise HTTPException(status_code=400, detail="Invalid GitHub URL")
+    if not valid_branch_name(branch):
+        raise HTTPException(status_code=400, detail="Invalid branch name")
     
-    # Create temporary directory
+    # Create temporary directory (removed by the job when it finishes)
     temp_dir = tempfile.mkdtemp()
     
-    try:
-        print(f"📂 Cloning repository: {repo_url}")
-        
-        # Clone repository
-        clone_dir = Path(temp_dir) / "repo"
-        
-        # Use shallow clone for speed
-        subprocess.run(
-            ["git", "clone", "--depth", "1", "--branch", branch, repo_url, str(clone_dir)],
-            check=True,
-            capture_output=True
-        )
-        
-        print(f"✅ Repository cloned to: {clone_dir}")
-        
-        # Analyze the project (reuse existing logic)
-        files = scan_project_files(clone_dir)
-        
-        if not files:
-            raise HTTPException(status_code=400, detail="No supported code files found in repository")
-        
-        print(f"✅ Found {len(files)} files")
+    job_id = create_job("github", repo_url, role)
+    submit_job(job_id, run_github_job, repo_url, branch, role, temp_dir)
+    
+    return JobResponse(job_id=job_id, status="queued")
+
+
+@app.post("/api/projects/{project_id}/update", response_model=JobResponse, status_code=202)
+async def update_github_project(project_id: str):
+    """Queue incremental re-analysis of a GitHub project against its branch tip"""
+    
+    project = get_project(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    if "github.com" not in project['path']:
+        raise HTTPException(status_code=400, detail="Only GitHub projects can be updated")
+    
+    job_id = create_job("update", project['path'], project['role'])
+    submit_job(job_id, run_update_job, project_id)
+    
+    return JobResponse(job_id=job_id, status="queued")
+
+
+@app.get("/api/projects")
+async def list_projects_endpoint(
+    request: Request,
+    limit: int = 50,
+    cursor: str = None,
+    fields: str = None
+):
+    """
+    Projects, newest first, one page at a time. Pass `next_cursor` back as
+    `cursor` for the next page; `fields` is a comma-separated projection.
+    """
+    
+    def build():
+        try:
+            projects, next_cursor = list_projects(
+                min(max(limit, 1), MAX_PAGE_SIZE),
+                cursor,
+                parse_fields(fields)
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        return {"projects": projects, "next_cursor": next_cursor}
+    
+    return await cached_json(request, ALL_PROJECTS, build)
+
+
+@app.get("/api/projects/{project_id}/files")
+async def get_project_files(
+    request: Request,
+    project_id: str,
+    limit: int = 200,
+    cursor: str = None,
+    fields: str = None
+):
+    """
+    Analyzed files of a project ordered by path, one page at a time (kept out
+    of /api/docs so docs load fast). `fields=file_path,class_names,...` selects
+    only what the client needs; `class_names`/`function_names` are names only.
+    """
+    
+    def build():
+        project = get_project(project_id)
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
         
-        # Analyze files
-        analyzed_data = []
-        for file_path in files:
-            analysis = analyze_file(file_path)
-            if analysis:
-                analyzed_data.append(analysis)
+        try:
+            files, next_cursor = list_files(
+                project_id,
+                min(max(limit, 1), MAX_PAGE_SIZE),
+                cursor,
+                parse_fields(fields)
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        return {"files": files, "next_cursor": next_cursor}
+    
+    return await cached_json(request, project_id, build)
+
+
+def parse_fields(fields: str):
+    """Split a comma-separated ?fields= value (None selects every field)"""
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(",") if field.strip()]
+
+
+@app.get("/api/projects/{project_id}/symbols")
+async def search_project_symbols(
+    request: Request,
+    project_id: str,
+    q: str,
+    kind: str = None,
+    limit: int = 50
+):
+    """Find classes, methods and functions by name or docstring"""
+    
+    if kind and kind not in ("class", "method", "function"):
+        raise HTTPException(status_code=400, detail="kind must be class, method or function")
+    
+    def build():
+        project = get_project(project_id)
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
         
-        print(f"✅ Analyzed {len(analyzed_data)} files")
+        return {"symbols": search_symbols(project_id, q, kind, min(max(limit, 1), SYMBOL_SEARCH_MAX_LIMIT))}
+    
+    return await cached_json(request, project_id, build)
+
+
+@app.get("/api/docs/{project_id}")
+async def get_project_documentation(request: Request, project_id: str):
+    """Get a project and the outline (titles and sizes) of its documentation sections"""
+    
+    def build():
+        project = get_project(project_id)
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
         
-        # Generate documentation
-        documentation = generate_documentation(analyzed_data, role)
-        print("✅ Documentation generated")
+        return {
+            "project": project,
+            "sections": get_documentation_outline(project_id)
+        }
+    
+    return await cached_json(request, project_id, build)
+
+
+@app.get("/api/docs/{project_id}/sections/{position}")
+async def get_documentation_section_endpoint(request: Request, project_id: str, position: int):
+    """Get the content of one documentation section"""
+    
+    def build():
+        section = get_documentation_section(project_id, position)
+        if not section:
+            raise HTTPException(status_code=404, detail="Section not found")
         
-        # Create KT plan
-        kt_plan = create_kt_plan(analyzed_data, role)
-        print("✅ KT plan created")
+        return section
+    
+    return await cached_json(request, project_id, build)
+
+
+@app.get("/api/docs/{project_id}/stream")
+async def stream_project_documentation(request: Request, project_id: str):
+    """
+    Stream documentation sections in order as newline-delimited JSON, one
+    section per chunk, so the first section renders before the rest arrive
+    """
+    
+    version = cached_version(project_id) or await run_in_threadpool(project_version, project_id)
+    response = not_modified(request, version)
+    if response:
+        return response
+    
+    project = await run_in_threadpool(get_project, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    def section_lines():
+        for section in iter_documentation_sections(project_id):
+            yield json.dumps(section) + "\n"
+    
+    # Uncompressed: gzip would hold sections back until its buffer fills
+    return StreamingResponse(
+        section_lines(),
+        media_type="application/x-ndjson",
+        headers={**cache_headers(version), "Content-Encoding": "identity"}
+    )
+
+
+@app.get("/api/kt/{project_id}")
+async def get_kt_plan_endpoint(request: Request, project_id: str):
+    """Get KT plan for a project"""
+    
+    def build():
+        project = get_project(project_id)
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
         
-        # Save to database
-        project_id = save_to_db(
-            repo_url,  # Store GitHub URL
-            analyzed_data, 
-            documentation, 
-            kt_plan,
-            role
-        )
+        kt_plan = get_kt_plan(project_id)
+        progress = get_user_progress(project_id)
         
-        return ProjectResponse(
-            project_id=project_id,
-            files_analyzed=len(analyzed_data),
-            status="completed"
-        )
-    
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Git clone failed: {e.stderr.decode()}")
-        raise HTTPException(status_code=400, detail="Failed to clone repository. Check URL and branch name.")
-    
-    except Exception as e:
-        print(f"❌ Error: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
-    
-    finally:
-        # Cleanup temporary files
+        return {
+            "project": project,
+            "kt_plan": kt_plan,
+            "progress": progress
+        }
+    
+    return await cached_json(request, project_id, build)
+
+
+@app.post("/api/progress/{project_id}")
+async def update_kt_progress(
+    project_id: str, 
+    day: int, 
+    completed: bool, 
+    notes: str = None
+):
+    """Update progress for a KT day"""
+    
+    project = get_project(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    update_progress(project_id, day, completed, notes)
+    
+    return {"status": "success", "message": "Progress updated"}
+
+
+@app.post("/api/chat")
+async def chat_endpoint(request: ChatRequest):
+    """
+    Answer a question about a project's code as server-sent events: the
+    retrieved `sources`, then the answer as `token` deltas while it is
+    written, then `done` (or `error`)
+    """
+    
+    from generators.chat_generator import answer_question
+    
+    if not request.question.strip():
+        raise HTTPException(status_code=400, detail="Question is empty")
+    
+    project = get_project(request.project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    async def event_source():
         try:
-            shutil.rmtree(temp_dir)
-            print("🧹 Cleaned up temporary files")
-        except:
-            pass
+            async for event, data in answer_question(request.question, project):
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except Exception as e:
+            print(f"❌ Chat failed: {str(e)}")
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+    
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        # Uncompressed: gzip would hold tokens back until its buffer fills
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Content-Encoding": "identity"}
+    )
 
 
-def find_project_root(extract_dir: Path) -> Path:
-    """Find actual project root (skip __MACOSX, etc.)"""
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """Hit/miss counters and size of the analysis, LLM response, embedding, HTTP response and retrieval caches"""
     
-    # Check if there's a single subdirectory (common in ZIPs)
-    subdirs = [d for d in extract_dir.iterdir() if d.is_dir() and not d.name.startswith('.') and d.name != '__MACOSX']
+    from analyzer.engine import get_analysis_cache
+    from generators.llm_client import get_response_cache
+    from rag.embeddings import get_embedding_cache, get_retrieval_caches
     
-    if len(subdirs) == 1:
-        return subdirs[0]
+    caches = {
+        "analysis": get_analysis_cache(),
+        "llm": get_response_cache(),
+        "embeddings": get_embedding_cache(),
+        "responses": get_http_response_cache(),
+        **get_retrieval_caches()
+    }
     
-    return extract_dir
+    return {
+        name: cache.stats() if cache else {"enabled": False}
+        for name, cache in caches.items()
+    }
+
+
+@app.get("/api/storage/stats")
+async def get_storage_stats_endpoint():
+    """Size of the compressed columns, compression ratio and decode latency"""
+    return get_storage_stats()
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Get status of an analysis job, including per-stage state"""
+    
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(
+    job_id: str,
+    last_event_id: int = Header(0),
+    after: int = 0
+):
+    """
+    Server-sent events for a job: stage transitions, files-analyzed progress,
+    documentation tokens and KT days as they are produced. Reconnecting
+    clients resume after the Last-Event-ID header (or `after`).
+    """
+    
+    if not get_job(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def event_source():
+        async for event in stream_events(job_id, max(last_event_id, after)):
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+            yield f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+    
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        # Uncompressed: gzip would hold events back until its buffer fills
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Content-Encoding": "identity"}
+    )
 
 
 # ... (keep all previous endpoints: /api/projects, /api/docs, etc.)
@@ -451,28 +662,6 @@ def find_project_root(extract_dir: Path) -> Path:
 #         "sources": results['metadatas'][0]
 #     }
 
-def scan_project_files(project_path: Path) -> List[Path]:
-    """Scan project folder for code files"""
-    supported_extensions = {'.py', '.js', '.jsx', '.ts', '.tsx'}
-    ignore_dirs = {'node_modules', 'venv', '__pycache__', '.git', 'dist', 'build'}
-    
-    files = []
-    for file_path in project_path.rglob('*'):
-        if any(ignored in file_path.parts for ignored in ignore_dirs):
-            continue
-        
-        if file_path.suffix in supported_extensions:
-            files.append(file_path)
-    
-    return files
-
-def analyze_file(file_path: Path) -> dict:
-    """Analyze a single file"""
-    if file_path.suffix == '.py':
-        return analyze_python_file(file_path)
-    # Add more analyzers as needed
-    return None
-
 # if __name__ == "__main__":
 #     import uvicorn
 #     uvicorn.run(app, host="0.0.0.0", port=8000)
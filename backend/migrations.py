@@ -0,0 +1,542 @@
+"""
+Versioned schema migrations for the SQLite store.
+
+Each migration has a schema step, applied at startup in one short
+transaction, and optionally a backfill that rewrites existing rows. A
+backfill runs in small batches, each in its own transaction, with a pause
+between them so requests can get the write lock. Its position is recorded
+after every batch, so an interrupted backfill resumes where it stopped.
+Code reading a table being backfilled must handle both old and new rows.
+
+Add a migration by appending a decorated function with the next version;
+never edit or renumber an applied one.
+
+Usage (from backend/):
+    python migrations.py           apply pending migrations and run backfills to completion
+    python migrations.py status    list migrations and their state
+"""
+
+import json
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from database import get_db_connection
+from curd import insert_sections, insert_symbols, encode_text, decode_text, COMPRESSED_COLUMNS, DB_COMPRESSION
+from http_cache import bump_all, EPOCH
+
+# Rows rewritten per backfill transaction, and the pause between batches
+MIGRATION_BATCH_SIZE = int(os.environ.get("MIGRATION_BATCH_SIZE", "500"))
+MIGRATION_BATCH_PAUSE = float(os.environ.get("MIGRATION_BATCH_PAUSE", "0.05"))
+
+# Backfill(cursor, after_id, batch_size) -> id of the last row handled, or None when done
+Backfill = Callable[..., Optional[int]]
+
+MIGRATIONS: List[Dict] = []
+
+_backfill_thread: Optional[threading.Thread] = None
+_backfill_lock = threading.Lock()
+
+
+def migration(
+    version: int,
+    name: str,
+    backfill: Optional[Backfill] = None,
+    backfill_enabled: bool = True,
+    changes_responses: bool = True
+):
+    """
+    Register a schema step (and optional batched backfill) as `version`.
+    A backfill registered with `backfill_enabled` False stays pending, not
+    completed, until a later start enables it. One registered with
+    `changes_responses` False (e.g. a re-encoding) leaves served data as it
+    was, so cached responses and ETags survive it.
+    """
+
+    def register(up: Callable):
+        assert not MIGRATIONS or version == MIGRATIONS[-1]['version'] + 1, "migration versions must be sequential"
+        MIGRATIONS.append({
+            'version': version,
+            'name': name,
+            'up': up,
+            'backfill': backfill,
+            'backfill_enabled': backfill_enabled,
+            'changes_responses': changes_responses
+        })
+        return up
+
+    return register
+
+
+def apply_migrations(background: bool = True):
+    """
+    Apply pending schema steps, then run pending backfills: on a background
+    thread so startup isn't blocked, or inline when `background` is False
+    """
+
+    with get_db_connection() as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                backfill_position INTEGER DEFAULT 0,
+                completed_at TIMESTAMP
+            )
+        """)
+
+    for entry in MIGRATIONS:
+        with get_db_connection() as conn:
+            # IMMEDIATE takes the write lock up front, so two processes
+            # starting together can't both apply the same migration
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.cursor()
+
+            cursor.execute("SELECT 1 FROM schema_migrations WHERE version = ?", (entry['version'],))
+            if cursor.fetchone():
+                continue
+
+            print(f"🔧 Applying migration {entry['version']}: {entry['name']}")
+            entry['up'](cursor)
+            cursor.execute("""
+                INSERT INTO schema_migrations (version, name, completed_at)
+                VALUES (?, ?, CASE WHEN ? THEN NULL ELSE CURRENT_TIMESTAMP END)
+            """, (entry['version'], entry['name'], entry['backfill'] is not None))
+
+    if background:
+        start_backfills()
+    else:
+        run_backfills()
+
+
+def start_backfills():
+    """Run pending backfills on a daemon thread (no-op if one is already running)"""
+
+    global _backfill_thread
+
+    with _backfill_lock:
+        if _backfill_thread and _backfill_thread.is_alive():
+            return
+        if not pending_backfills():
+            return
+        _backfill_thread = threading.Thread(target=run_backfills, name="db-backfill", daemon=True)
+        _backfill_thread.start()
+
+
+def run_backfills():
+    """Run every pending backfill to completion, oldest migration first"""
+
+    for entry in pending_backfills():
+        run_backfill(entry)
+
+
+def run_backfill(entry: Dict):
+    """Run one migration's backfill in batches, resuming from its recorded position"""
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT backfill_position FROM schema_migrations WHERE version = ?", (entry['version'],))
+        position = cursor.fetchone()[0] or 0
+
+    print(f"🔧 Backfilling migration {entry['version']}: {entry['name']}")
+    batches = 0
+
+    while True:
+        with get_db_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.cursor()
+            last_id = entry['backfill'](cursor, position, MIGRATION_BATCH_SIZE)
+
+            if last_id is None:
+                cursor.execute("""
+                    UPDATE schema_migrations SET completed_at = CURRENT_TIMESTAMP WHERE version = ?
+                """, (entry['version'],))
+                # Responses cached or ETagged before (or during) the backfill
+                # may lack what it added; invalidate them once, not per batch
+                if entry['changes_responses']:
+                    bump_all()
+                break
+
+            position = last_id
+            cursor.execute("""
+                UPDATE schema_migrations SET backfill_position = ? WHERE version = ?
+            """, (position, entry['version']))
+
+        batches += 1
+        time.sleep(MIGRATION_BATCH_PAUSE)
+
+    print(f"✅ Migration {entry['version']} backfilled ({batches} batches)")
+
+
+def pending_backfills() -> List[Dict]:
+    """Applied migrations whose backfill hasn't finished and is enabled"""
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT version FROM schema_migrations WHERE completed_at IS NULL")
+        pending = {row[0] for row in cursor.fetchall()}
+
+    return [
+        entry for entry in MIGRATIONS
+        if entry['version'] in pending and entry['backfill'] and entry['backfill_enabled']
+    ]
+
+
+def migration_status() -> List[Dict]:
+    """Every known migration with its applied/backfill state"""
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT * FROM schema_migrations")
+            applied = {row['version']: dict(row) for row in cursor.fetchall()}
+        except sqlite3.OperationalError:
+            # Database predates the migration runner
+            applied = {}
+
+    return [
+        {
+            'version': entry['version'],
+            'name': entry['name'],
+            'applied_at': applied.get(entry['version'], {}).get('applied_at'),
+            'backfill_position': applied.get(entry['version'], {}).get('backfill_position'),
+            'completed_at': applied.get(entry['version'], {}).get('completed_at'),
+            'backfill_enabled': entry['backfill_enabled']
+        }
+        for entry in MIGRATIONS
+    ]
+
+
+def add_column_if_missing(cursor, table: str, column: str, definition: str):
+    """Add a column to an existing table (CREATE TABLE IF NOT EXISTS won't)"""
+
+    cursor.execute(f"PRAGMA table_info({table})")
+    existing = {row[1] for row in cursor.fetchall()}
+
+    if column not in existing:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+# ---------------------------------------------------------------------------
+# Migrations. Steps use IF NOT EXISTS / add_column_if_missing so databases
+# created before this runner existed can replay them safely.
+# ---------------------------------------------------------------------------
+
+@migration(1, "create base tables")
+def create_base_tables(cursor):
+    # Projects table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS projects (
+            id TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            role TEXT NOT NULL,
+            files_analyzed INTEGER,
+            status TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Files table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS files (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            project_id TEXT NOT NULL,
+            file_path TEXT NOT NULL,
+            file_name TEXT NOT NULL,
+            complexity INTEGER,
+            classes TEXT,  -- JSON string
+            functions TEXT,  -- JSON string
+            imports TEXT,  -- JSON string
+            FOREIGN KEY (project_id) REFERENCES projects(id)
+        )
+    """)
+
+    # Documentation table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS documentation (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            project_id TEXT NOT NULL,
+            content TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (project_id) REFERENCES projects(id)
+        )
+    """)
+
+    # KT Plans table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS kt_plans (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            project_id TEXT NOT NULL,
+            plan TEXT NOT NULL,  -- JSON string
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (project_id) REFERENCES projects(id)
+        )
+    """)
+
+    # User Progress table (for tracking KT completion)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_progress (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            project_id TEXT NOT NULL,
+            day INTEGER NOT NULL,
+            completed BOOLEAN DEFAULT FALSE,
+            completed_at TIMESTAMP,
+            notes TEXT,
+            FOREIGN KEY (project_id) REFERENCES projects(id)
+        )
+    """)
+
+
+@migration(2, "track analyzed branch and commit")
+def add_project_commit_columns(cursor):
+    # Used for incremental re-analysis
+    add_column_if_missing(cursor, "projects", "branch", "TEXT")
+    add_column_if_missing(cursor, "projects", "commit_sha", "TEXT")
+    add_column_if_missing(cursor, "projects", "updated_at", "TIMESTAMP")
+
+
+def backfill_documentation_sections(cursor, after_id: int, batch_size: int) -> Optional[int]:
+    """Split documentation stored before sections existed (content may already be compressed)"""
+
+    cursor.execute("""
+        SELECT id, project_id, content FROM documentation d
+        WHERE id > ?
+        AND NOT EXISTS (SELECT 1 FROM documentation_sections s WHERE s.documentation_id = d.id)
+        ORDER BY id
+        LIMIT ?
+    """, (after_id, batch_size))
+    rows = cursor.fetchall()
+
+    for documentation_id, project_id, content in rows:
+        insert_sections(cursor, documentation_id, project_id, decode_text(content))
+
+    return rows[-1][0] if rows else None
+
+
+@migration(3, "documentation sections", backfill=backfill_documentation_sections)
+def create_documentation_sections(cursor):
+    # One row per top-level heading, served on demand
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS documentation_sections (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            documentation_id INTEGER NOT NULL,
+            project_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            level INTEGER NOT NULL,
+            content TEXT NOT NULL,
+            FOREIGN KEY (documentation_id) REFERENCES documentation(id),
+            FOREIGN KEY (project_id) REFERENCES projects(id)
+        )
+    """)
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_documentation_sections_doc
+        ON documentation_sections (documentation_id, position)
+    """)
+
+
+@migration(4, "index per-project lookups")
+def create_project_indexes(cursor):
+    # SQLite builds an index in one statement; this holds the write lock
+    # for one pass over each table
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_files_project ON files (project_id, file_path)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_documentation_project ON documentation (project_id, created_at, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_kt_plans_project ON kt_plans (project_id, created_at, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_progress_project_day ON user_progress (project_id, day)")
+
+
+def backfill_symbols(cursor, after_id: int, batch_size: int) -> Optional[int]:
+    """Extract symbols from file rows stored before the symbols table existed"""
+
+    cursor.execute("""
+        SELECT id, project_id, file_path, classes, functions FROM files f
+        WHERE id > ?
+        AND NOT EXISTS (
+            SELECT 1 FROM symbols s WHERE s.project_id = f.project_id AND s.file_path = f.file_path
+        )
+        ORDER BY id
+        LIMIT ?
+    """, (after_id, batch_size))
+    rows = cursor.fetchall()
+
+    for row in rows:
+        insert_symbols(cursor, row['project_id'], [{
+            'file_path': row['file_path'],
+            'classes': json.loads(decode_text(row['classes']) or '[]'),
+            'functions': json.loads(decode_text(row['functions']) or '[]')
+        }])
+
+    return rows[-1]['id'] if rows else None
+
+
+@migration(5, "symbols table with full-text search", backfill=backfill_symbols)
+def create_symbols(cursor):
+    # One row per class / method / top-level function, for symbol lookups
+    # without decoding every file's JSON
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS symbols (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            project_id TEXT NOT NULL,
+            file_path TEXT NOT NULL,
+            kind TEXT NOT NULL,  -- class | method | function
+            name TEXT NOT NULL,
+            parent TEXT,  -- enclosing class of a method
+            line INTEGER,
+            docstring TEXT,
+            FOREIGN KEY (project_id) REFERENCES projects(id)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_symbols_project_file ON symbols (project_id, file_path)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_symbols_project_name ON symbols (project_id, name)")
+
+    # Full-text index over names and docstrings, kept in sync by triggers;
+    # project_id is indexed too so a search only reads one project's postings
+    try:
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS symbols_fts USING fts5(
+                name, docstring, project_id,
+                content='symbols', content_rowid='id'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        print(f"⚠️ Full-text search unavailable ({str(e)}), symbol search will use LIKE")
+        return
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS symbols_fts_insert AFTER INSERT ON symbols BEGIN
+            INSERT INTO symbols_fts (rowid, name, docstring, project_id)
+            VALUES (new.id, new.name, new.docstring, new.project_id);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS symbols_fts_delete AFTER DELETE ON symbols BEGIN
+            INSERT INTO symbols_fts (symbols_fts, rowid, name, docstring, project_id)
+            VALUES ('delete', old.id, old.name, old.docstring, old.project_id);
+        END
+    """)
+
+
+def compress_rows(table: str) -> Backfill:
+    """Backfill that rewrites a table's uncompressed values with encode_text"""
+
+    columns = COMPRESSED_COLUMNS[table]
+
+    def backfill(cursor, after_id: int, batch_size: int) -> Optional[int]:
+        cursor.execute(f"""
+            SELECT id, {', '.join(columns)} FROM {table}
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+        """, (after_id, batch_size))
+        rows = cursor.fetchall()
+
+        updates = []
+        for row in rows:
+            values = [row[column] for column in columns]
+            encoded = [encode_text(value) if isinstance(value, str) else value for value in values]
+            if encoded != values:
+                updates.append((*encoded, row['id']))
+
+        cursor.executemany(f"""
+            UPDATE {table} SET {', '.join(f'{column} = ?' for column in columns)} WHERE id = ?
+        """, updates)
+
+        return rows[-1]['id'] if rows else None
+
+    return backfill
+
+
+# Compression needs no schema change (SQLite columns accept BLOBs); the
+# backfills rewrite existing rows while readers decode both formats, so
+# responses don't change. With DB_COMPRESSION=0 they would change nothing,
+# so they wait until it is on.
+
+@migration(6, "compress file analyses", backfill=compress_rows("files"),
+           backfill_enabled=DB_COMPRESSION, changes_responses=False)
+def compress_files(cursor):
+    pass
+
+
+@migration(7, "compress documentation", backfill=compress_rows("documentation"),
+           backfill_enabled=DB_COMPRESSION, changes_responses=False)
+def compress_documentation(cursor):
+    pass
+
+
+@migration(8, "compress KT plans", backfill=compress_rows("kt_plans"),
+           backfill_enabled=DB_COMPRESSION, changes_responses=False)
+def compress_kt_plans(cursor):
+    pass
+
+
+@migration(9, "index project listing order")
+def create_project_listing_index(cursor):
+    # Keyset pagination of /api/projects walks (created_at, id) newest first
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_projects_created ON projects (created_at, id)")
+
+
+@migration(10, "HTTP cache versions")
+def create_cache_versions(cursor):
+    # ETag / response-cache version per project, bumped in the same
+    # transaction as the write, so every process sees the change
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS cache_versions (
+            key TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+    """)
+    cursor.execute(
+        "INSERT OR IGNORE INTO cache_versions (key, version) VALUES (?, ?)",
+        (EPOCH, random.getrandbits(31))
+    )
+
+
+def compress_sections(cursor, after_id: int, batch_size: int) -> Optional[int]:
+    """Compress section content stored as text, recording its original size"""
+
+    cursor.execute("""
+        SELECT id, content FROM documentation_sections
+        WHERE id > ?
+        ORDER BY id
+        LIMIT ?
+    """, (after_id, batch_size))
+    rows = cursor.fetchall()
+
+    cursor.executemany("""
+        UPDATE documentation_sections SET content = ?, size = ? WHERE id = ?
+    """, [
+        (encode_text(row['content']), len(row['content']), row['id'])
+        for row in rows
+        if isinstance(row['content'], str)
+    ])
+
+    return rows[-1]['id'] if rows else None
+
+
+@migration(11, "compress documentation sections", backfill=compress_sections,
+           backfill_enabled=DB_COMPRESSION, changes_responses=False)
+def compress_documentation_sections(cursor):
+    # Sections repeat the whole documentation; compressed like it, with the
+    # uncompressed length kept for the outline's section sizes
+    add_column_if_missing(cursor, "documentation_sections", "size", "INTEGER")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["status"]:
+        for entry in migration_status():
+            if entry['applied_at'] is None:
+                state = "pending"
+            elif entry['completed_at'] is None and not entry['backfill_enabled']:
+                state = "backfill deferred (disabled by configuration)"
+            elif entry['completed_at'] is None:
+                state = f"backfilling (after id {entry['backfill_position']})"
+            else:
+                state = f"done {entry['completed_at']}"
+            print(f"{entry['version']:>4}  {entry['name']:<40} {state}")
+    else:
+        from database import init_database
+        init_database(background=False)
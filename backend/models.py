@@ -11,6 +11,14 @@ class ProjectResponse(BaseModel):
     files_analyzed: int
     status: str
 
+class JobResponse(BaseModel):
+    job_id: str
+    status: str
+
+class ChatRequest(BaseModel):
+    question: str
+    project_id: str
+
 class FileAnalysis(BaseModel):
     file_path: str
     file_name: str
@@ -0,0 +1,425 @@
+import asyncio
+import shutil
+import subprocess
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional, Tuple
+
+from curd import save_to_db, get_project, get_files, update_project_analysis
+from generators.doc_generator import agenerate_documentation
+from generators.kt_generator import acreate_kt_plan
+from generators.llm_client import run
+from analyzer.engine import analyze_files
+from jobs import start_stage, complete_stage, skip_stage, complete_job, add_partial_result, publish_event
+from repo_mirror import sync_mirror, diff_commits, head_commit, mirror_lock
+from walker import (
+    walk_project_files, filter_project_paths, is_supported_path, is_ignored_path, parse_gitignore,
+    GITIGNORE, MAX_FILE_SIZE_KB
+)
+
+
+def run_upload_job(job_id: str, zip_path: Path, filename: str, role: str, temp_dir: str):
+    """Background job: extract an uploaded ZIP and analyze it"""
+
+    try:
+        start_stage(job_id, "fetch")
+        extract_dir = Path(temp_dir) / "project"
+        extract_dir.mkdir()
+
+        extracted = extract_supported_files(zip_path, extract_dir)
+        print(f"✅ Extracted {extracted} code files to: {extract_dir}")
+
+        # Find the actual project root (skip __MACOSX, .DS_Store, etc.)
+        project_root = find_project_root(extract_dir)
+        complete_stage(job_id, "fetch")
+
+        run_analysis(job_id, project_root, filename, role)
+
+    finally:
+        cleanup(temp_dir)
+
+
+def run_github_job(job_id: str, repo_url: str, branch: str, role: str, temp_dir: str):
+    """Background job: clone a GitHub repository and analyze it"""
+
+    try:
+        start_stage(job_id, "fetch")
+        print(f"📂 Cloning repository: {repo_url}")
+
+        clone_dir = Path(temp_dir) / "repo"
+
+        # Use shallow clone for speed
+        try:
+            subprocess.run(
+                ["git", "clone", "--depth", "1", "--branch", branch, "--", repo_url, str(clone_dir)],
+                check=True,
+                capture_output=True
+            )
+        except subprocess.CalledProcessError as e:
+            print(f"❌ Git clone failed: {e.stderr.decode()}")
+            raise RuntimeError("Failed to clone repository. Check URL and branch name.")
+
+        commit_sha = head_commit(clone_dir)
+        print(f"✅ Repository cloned to: {clone_dir} ({commit_sha[:8]})")
+        complete_stage(job_id, "fetch", commit_sha=commit_sha)
+
+        run_analysis(job_id, clone_dir, repo_url, role, branch=branch, commit_sha=commit_sha)
+
+    finally:
+        cleanup(temp_dir)
+
+
+def run_update_job(job_id: str, project_id: str):
+    """
+    Background job: bring a GitHub project up to date with its branch.
+    Only files changed since the last analyzed commit are re-analyzed, and
+    documentation / KT plan are only regenerated when analyses changed.
+    """
+
+    project = get_project(project_id)
+    repo_url = project['path']
+    branch = project.get('branch') or "main"
+    role = project['role']
+
+    with mirror_lock(repo_url):
+        start_stage(job_id, "fetch")
+        try:
+            repo_dir, commit_sha = sync_mirror(repo_url, branch)
+        except subprocess.CalledProcessError as e:
+            print(f"❌ Git fetch failed: {e.stderr.decode()}")
+            raise RuntimeError("Failed to fetch repository. Check URL and branch name.")
+        except ValueError as e:
+            raise RuntimeError(str(e))
+        complete_stage(job_id, "fetch", commit_sha=commit_sha)
+
+        existing = {f['file_path']: f for f in get_files(project_id)}
+
+        if commit_sha == project.get('commit_sha'):
+            for stage in ("scan", "analyze", "documentation", "kt_plan", "save", "index"):
+                skip_stage(job_id, stage, "Already up to date")
+            complete_job(job_id, project_id, len(existing))
+            return
+
+        # 1. Work out which files changed since the last analyzed commit
+        start_stage(job_id, "scan")
+        diff = diff_commits(repo_dir, project['commit_sha'], commit_sha) if project.get('commit_sha') else None
+
+        if diff is None:
+            # Unknown base commit: re-check every file (unchanged ones hit the analysis cache)
+            changed_paths = [relative_path(p, repo_dir) for p in scan_project_files(repo_dir)]
+            current = set(changed_paths)
+            removed_paths = [path for path in existing if path not in current]
+        else:
+            # Same .gitignore rules and size limit as a full scan
+            changed_paths = filter_project_paths(repo_dir, diff[0])
+            kept = set(changed_paths)
+            removed_paths = [path for path in diff[1] if path in existing]
+            # Changed files a full scan would now skip (e.g. grown past the limit) go too
+            removed_paths += [path for path in diff[0] if path in existing and path not in kept]
+
+        complete_stage(job_id, "scan", files_changed=len(changed_paths), files_removed=len(removed_paths))
+
+        # 2. Re-analyze changed files only
+        start_stage(job_id, "analyze")
+        changed_files = analyze_files(
+            [repo_dir / path for path in changed_paths],
+            on_progress=lambda done: publish_event(
+                job_id, "progress", {"files_found": len(changed_paths), "files_analyzed": done}
+            )
+        )
+        relativize(changed_files, repo_dir)
+
+        # Files that no longer parse are dropped like removed ones
+        analyzed_paths = {f['file_path'] for f in changed_files}
+        removed_paths += [
+            path for path in changed_paths
+            if path not in analyzed_paths and path in existing
+        ]
+        # Chunks embed each symbol's source, so every analyzed file is re-indexed;
+        # only files whose analysis differs regenerate the docs and KT plan
+        reindexed_files = changed_files
+        changed_files = [f for f in changed_files if _differs(f, existing.get(f['file_path']))]
+        complete_stage(job_id, "analyze", files_analyzed=len(changed_files))
+
+    # 3. Regenerate only what the changes affect
+    for path in removed_paths:
+        existing.pop(path, None)
+    file_set_changed = bool(removed_paths) or any(f['file_path'] not in existing for f in changed_files)
+    for file_data in changed_files:
+        existing[file_data['file_path']] = file_data
+    analyzed_data = sorted(existing.values(), key=lambda f: f['file_path'])
+
+    if not (changed_files or removed_paths):
+        skip_stage(job_id, "documentation", "No analyzed files changed")
+    if not file_set_changed:
+        skip_stage(job_id, "kt_plan", "Set of files unchanged")
+
+    documentation, kt_plan = generate_outputs(
+        job_id,
+        analyzed_data,
+        role,
+        documentation=bool(changed_files or removed_paths),
+        kt_plan=file_set_changed
+    )
+
+    # 4. Persist the delta
+    start_stage(job_id, "save")
+    update_project_analysis(
+        project_id,
+        changed_files,
+        removed_paths,
+        len(analyzed_data),
+        commit_sha,
+        documentation,
+        kt_plan
+    )
+    complete_stage(job_id, "save", project_id=project_id)
+
+    # The symbols behind lexical search changed, whether or not re-indexing succeeds
+    from rag.embeddings import invalidate_search_results
+    invalidate_search_results(project_id)
+
+    # 5. Re-index every file the diff touched (snippets are read from the mirror, so under its lock)
+    with mirror_lock(repo_url):
+        if head_commit(repo_dir) == commit_sha:
+            index_project(job_id, project_id, reindexed_files, repo_dir, removed_paths)
+        else:
+            skip_stage(job_id, "index", "Mirror moved on; the newer update re-indexes")
+
+    print(f"✅ Updated {len(changed_files)} files, removed {len(removed_paths)}")
+    complete_job(job_id, project_id, len(analyzed_data))
+
+
+def run_analysis(
+    job_id: str,
+    project_root: Path,
+    source: str,
+    role: str,
+    branch: str = None,
+    commit_sha: str = None
+):
+    """Run scan → analyze → documentation → KT plan → save for a job"""
+
+    # Scanning and analysis overlap: files are parsed as the walker yields them
+    start_stage(job_id, "scan")
+    start_stage(job_id, "analyze")
+    found = []
+
+    def scanned_files():
+        for file_path in walk_project_files(project_root):
+            found.append(file_path)
+            yield file_path
+
+    def on_progress(files_analyzed: int):
+        publish_event(job_id, "progress", {"files_found": len(found), "files_analyzed": files_analyzed})
+
+    analyzed_data = analyze_files(scanned_files(), on_progress=on_progress)
+
+    if not found:
+        raise ValueError("No supported code files found")
+
+    print(f"✅ Found {len(found)} files")
+    complete_stage(job_id, "scan", files_found=len(found))
+
+    relativize(analyzed_data, project_root)
+
+    print(f"✅ Analyzed {len(analyzed_data)} files")
+    complete_stage(job_id, "analyze", files_analyzed=len(analyzed_data))
+
+    documentation, kt_plan = generate_outputs(job_id, analyzed_data, role)
+    print("✅ Documentation and KT plan generated")
+
+    start_stage(job_id, "save")
+    project_id = save_to_db(
+        source,
+        analyzed_data,
+        documentation,
+        kt_plan,
+        role,
+        branch=branch,
+        commit_sha=commit_sha
+    )
+    complete_stage(job_id, "save", project_id=project_id)
+
+    index_project(job_id, project_id, analyzed_data, project_root)
+
+    complete_job(job_id, project_id, len(analyzed_data))
+
+
+def index_project(
+    job_id: str,
+    project_id: str,
+    analyzed_data: List[Dict],
+    project_root: Path,
+    removed_paths: List[str] = ()
+):
+    """
+    Replace the embeddings of the given files (and drop those of removed
+    files). Best effort: the project is already saved, so a failure here
+    (e.g. no vector store available) skips the stage instead of failing the job.
+    """
+
+    start_stage(job_id, "index")
+    try:
+        from rag.embeddings import create_embeddings, delete_file_embeddings
+
+        delete_file_embeddings(project_id, list(removed_paths) + [f['file_path'] for f in analyzed_data])
+        chunks = create_embeddings(
+            analyzed_data,
+            project_id,
+            project_root,
+            on_progress=lambda indexed: publish_event(job_id, "index_progress", {"chunks_indexed": indexed})
+        )
+    except Exception as e:
+        print(f"❌ Indexing failed: {str(e)}")
+        skip_stage(job_id, "index", f"Indexing failed: {str(e)}")
+        return
+
+    print(f"✅ Indexed {chunks} chunks")
+    complete_stage(job_id, "index", chunks_indexed=chunks)
+
+
+def extract_supported_files(zip_path: Path, extract_dir: Path) -> int:
+    """
+    Extract only the members scan_project_files would pick up, streaming each
+    one to disk (binaries, assets, ignored directories and .gitignore'd paths
+    are never written). The archive's .gitignore files are extracted too.
+    Returns: number of code files extracted
+    """
+
+    root = extract_dir.resolve()
+    max_bytes = MAX_FILE_SIZE_KB * 1024
+    extracted = 0
+
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        members = [
+            member for member in zip_ref.infolist()
+            if not member.is_dir() and '__MACOSX' not in member.filename
+        ]
+
+        # .gitignore rules by archive directory, read before anything is written
+        gitignores = {
+            member for member in members
+            if PurePosixPath(member.filename).name == GITIGNORE and member.file_size <= max_bytes
+        }
+        local_rules = {
+            PurePosixPath(member.filename).parent: parse_gitignore(zip_ref.read(member).decode('utf-8', errors='ignore'))
+            for member in gitignores
+        }
+
+        def rules_in(directory, parent_rules):
+            rules = local_rules.get(directory)
+            return parent_rules + [(directory, rules)] if rules else parent_rules
+
+        for member in members:
+            if member not in gitignores:
+                if not is_supported_path(member.filename) or member.file_size > max_bytes:
+                    continue
+                if is_ignored_path(PurePosixPath(), member.filename, rules_in):
+                    continue
+
+            # Reject absolute paths and '..' entries (zip slip)
+            target = (root / member.filename).resolve()
+            if root not in target.parents:
+                print(f"⚠️ Skipping unsafe ZIP entry: {member.filename}")
+                continue
+
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with zip_ref.open(member) as source, open(target, 'wb') as dest:
+                shutil.copyfileobj(source, dest)
+            if member not in gitignores:
+                extracted += 1
+
+    return extracted
+
+
+def generate_outputs(
+    job_id: str,
+    analyzed_data: List[Dict],
+    role: str,
+    documentation: bool = True,
+    kt_plan: bool = True
+) -> Tuple[Optional[str], Optional[Dict]]:
+    """
+    Generate documentation and KT plan concurrently on the shared LLM loop,
+    so the stage takes as long as the slower of the two rather than both
+    Returns: (documentation, kt_plan), None for whichever wasn't requested
+    """
+
+    def on_token(text: str):
+        # Documentation is streamed to event subscribers as it is written
+        publish_event(job_id, "token", {"text": text})
+
+    def on_day(day_plan: Dict):
+        # Days become visible on the job as soon as they stream in
+        add_partial_result(job_id, "kt_plan_days", day_plan)
+
+    async def tracked(stage: str, coro):
+        start_stage(job_id, stage)
+        result = await coro
+        complete_stage(job_id, stage)
+        return result
+
+    async def generate_all():
+        tasks = [
+            asyncio.ensure_future(tracked("documentation", agenerate_documentation(analyzed_data, role, on_token=on_token)))
+            if documentation else None,
+            asyncio.ensure_future(tracked("kt_plan", acreate_kt_plan(analyzed_data, role, on_day=on_day)))
+            if kt_plan else None
+        ]
+        try:
+            return tuple([await task if task else None for task in tasks])
+        except Exception:
+            for task in tasks:
+                if task:
+                    task.cancel()
+            raise
+
+    return run(generate_all())
+
+
+def find_project_root(extract_dir: Path) -> Path:
+    """Find actual project root (skip __MACOSX, etc.)"""
+
+    # Check if there's a single subdirectory (common in ZIPs)
+    subdirs = [d for d in extract_dir.iterdir() if d.is_dir() and not d.name.startswith('.') and d.name != '__MACOSX']
+
+    if len(subdirs) == 1:
+        return subdirs[0]
+
+    return extract_dir
+
+
+def scan_project_files(project_path: Path) -> List[Path]:
+    """Scan project folder for code files"""
+    return list(walk_project_files(project_path))
+
+
+def relative_path(file_path: Path, project_root: Path) -> str:
+    """Project-relative POSIX path, stable across temp dirs and mirrors"""
+    return Path(file_path).relative_to(project_root).as_posix()
+
+
+def relativize(analyzed_data: List[Dict], project_root: Path):
+    """Store file paths relative to the project root instead of absolute temp paths"""
+    for file_data in analyzed_data:
+        file_data['file_path'] = relative_path(file_data['file_path'], project_root)
+
+
+def _differs(file_data: Dict, stored: Dict) -> bool:
+    """Whether a fresh analysis differs from the stored row"""
+    if stored is None:
+        return True
+    return any(
+        file_data.get(key) != stored.get(key)
+        for key in ('complexity', 'classes', 'functions', 'imports')
+    )
+
+
+def cleanup(temp_dir: str):
+    """Remove a job's temporary directory"""
+    try:
+        shutil.rmtree(temp_dir)
+        print("🧹 Cleaned up temporary files")
+    except:
+        pass
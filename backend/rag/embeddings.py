@@ -1,68 +1,464 @@
-import chromadb
-from chromadb.utils import embedding_functions
-from typing import List, Dict
+import hashlib
+import os
+import re
+import threading
+from itertools import islice
+from pathlib import Path, PurePosixPath
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
-# Initialize ChromaDB
-chroma_client = chromadb.PersistentClient(path="./chroma_db")
-embedding_func = embedding_functions.SentenceTransformerEmbeddingFunction(
-    model_name="all-MiniLM-L6-v2"
-)
+from cache_store import MemoryCache, VectorCache
+from curd import search_symbols
 
-def create_embeddings(analyzed_files: List[Dict], project_id: str):
-    """Create embeddings for all code files"""
+# Where collections are persisted, and the model that embeds them
+CHROMA_PATH = os.environ.get("CHROMA_PATH", "./chroma_db")
+EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+
+# Chunks embedded and written per collection call, and the longest source
+# snippet embedded per chunk (the model truncates long inputs anyway)
+EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_CHUNK_MAX_LINES = int(os.environ.get("EMBEDDING_CHUNK_MAX_LINES", "60"))
+
+# Persistent cache of chunk embeddings keyed by hash(model, chunk text), so
+# re-indexing only embeds chunks whose text changed
+EMBEDDING_CACHE_ENABLED = os.environ.get("EMBEDDING_CACHE_ENABLED", "1") == "1"
+EMBEDDING_CACHE_PATH = Path(os.environ.get("EMBEDDING_CACHE_PATH", "./data/embedding_cache.db"))
+EMBEDDING_CACHE_MAX_MB = int(os.environ.get("EMBEDDING_CACHE_MAX_MB", "1024"))
+
+# Hybrid search: candidates taken from each ranking per requested result,
+# and the k of reciprocal rank fusion (higher flattens rank differences)
+RETRIEVAL_CANDIDATES = int(os.environ.get("RETRIEVAL_CANDIDATES", "4"))
+RETRIEVAL_RRF_K = int(os.environ.get("RETRIEVAL_RRF_K", "60"))
+
+# Open collection handles and query embeddings kept in memory, and how long
+# search results are reused for a repeated (project, query)
+COLLECTION_CACHE_SIZE = int(os.environ.get("COLLECTION_CACHE_SIZE", "32"))
+QUERY_EMBEDDING_CACHE_SIZE = int(os.environ.get("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+RETRIEVAL_CACHE_SIZE = int(os.environ.get("RETRIEVAL_CACHE_SIZE", "1024"))
+RETRIEVAL_CACHE_TTL = float(os.environ.get("RETRIEVAL_CACHE_TTL", "300"))
+
+IDENTIFIER_PATTERN = re.compile(r'[A-Za-z_]\w*(\.[A-Za-z_]\w*)*')
+
+# Words left out of lexical queries (they match docstrings everywhere)
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'be', 'by', 'called', 'code', 'do', 'does', 'for',
+    'from', 'how', 'in', 'is', 'it', 'of', 'on', 'or', 'the', 'this', 'to',
+    'used', 'what', 'when', 'where', 'which', 'who', 'why', 'with'
+}
+
+# Created on first use: importing chromadb and loading the model take
+# seconds and hundreds of MB, which requests that never search shouldn't pay
+_chroma_client = None
+_embedding_func = None
+_embedding_cache: Optional[VectorCache] = None
+_init_lock = threading.Lock()
+
+_collections = MemoryCache(COLLECTION_CACHE_SIZE)
+_query_embeddings = MemoryCache(QUERY_EMBEDDING_CACHE_SIZE)
+# Keyed by (project id, index generation, whitespace-normalized query, n_results)
+_search_results = MemoryCache(RETRIEVAL_CACHE_SIZE, ttl_seconds=RETRIEVAL_CACHE_TTL)
+# Bumped whenever a project's index or symbols change (not on other writes,
+# e.g. KT progress); a search that started before the change stores its
+# results under the old generation, where no one looks
+_index_generations: Dict[str, int] = {}
+_generations_lock = threading.Lock()
+
+def get_chroma_client():
+    """Shared persistent ChromaDB client"""
+    
+    global _chroma_client
+    
+    if _chroma_client is None:
+        with _init_lock:
+            if _chroma_client is None:
+                import chromadb
+                _chroma_client = chromadb.PersistentClient(path=CHROMA_PATH)
+    return _chroma_client
+
+def get_embedding_function():
+    """Shared sentence-transformer embedding function (model loaded once)"""
+    
+    global _embedding_func
+    
+    if _embedding_func is None:
+        with _init_lock:
+            if _embedding_func is None:
+                from chromadb.utils import embedding_functions
+                _embedding_func = embedding_functions.SentenceTransformerEmbeddingFunction(
+                    model_name=EMBEDDING_MODEL
+                )
+    return _embedding_func
+
+def get_embedding_cache() -> Optional[VectorCache]:
+    """Shared embedding cache, or None when disabled"""
+    
+    global _embedding_cache
+    
+    if not EMBEDDING_CACHE_ENABLED:
+        return None
     
-    collection = chroma_client.get_or_create_collection(
+    with _init_lock:
+        if _embedding_cache is None:
+            _embedding_cache = VectorCache(
+                EMBEDDING_CACHE_PATH,
+                max_bytes=EMBEDDING_CACHE_MAX_MB * 1024 * 1024
+            )
+        return _embedding_cache
+
+def embed_documents(documents: List[str]) -> List[List[float]]:
+    """Embed texts, running the model only on those not in the embedding cache"""
+    
+    cache = get_embedding_cache()
+    if not cache:
+        return get_embedding_function()(documents)
+    
+    keys = [embedding_key(document) for document in documents]
+    vectors = cache.get_many(keys)
+    
+    missing = {key: document for key, document in zip(keys, documents) if key not in vectors}
+    if missing:
+        computed = dict(zip(missing, get_embedding_function()(list(missing.values()))))
+        cache.set_many(computed.items())
+        vectors.update(computed)
+    
+    return [vectors[key] for key in keys]
+
+def embedding_key(document: str) -> str:
+    """Cache key of a text's embedding under the configured model"""
+    return hashlib.sha256(f"{EMBEDDING_MODEL}\0{document}".encode()).hexdigest()
+
+def create_embeddings(
+    analyzed_files: Iterable[Dict],
+    project_id: str,
+    project_root: Optional[Path] = None,
+    on_progress: Optional[Callable[[int], None]] = None
+) -> int:
+    """
+    Index a project's code one chunk per file summary, class, method and
+    function. Chunks are embedded and written EMBEDDING_BATCH_SIZE at a
+    time, so memory stays flat however large the project is; chunks whose
+    text was embedded before (any project) come from the cache. Source
+    snippets are read from `project_root` when given.
+    `on_progress(indexed)` is called with the running chunk count.
+    Returns: number of chunks indexed
+    """
+    
+    # Embeddings are always passed in, so the collection needs no embedding function
+    collection = get_chroma_client().get_or_create_collection(
         name=f"project_{project_id}",
-        embedding_function=embedding_func
+        embedding_function=None
     )
+    _collections.set(project_id, collection)
     
-    documents = []
-    metadatas = []
-    ids = []
+    indexed = 0
+    for batch in batched(iter_chunks(analyzed_files, project_root), EMBEDDING_BATCH_SIZE):
+        documents = [chunk['document'] for chunk in batch]
+        # Upsert: re-indexing a file replaces its chunks instead of failing
+        collection.upsert(
+            documents=documents,
+            embeddings=embed_documents(documents),
+            metadatas=[chunk['metadata'] for chunk in batch],
+            ids=[chunk['id'] for chunk in batch]
+        )
+        indexed += len(batch)
+        if on_progress:
+            on_progress(indexed)
     
-    for idx, file in enumerate(analyzed_files):
-        # Create searchable text from file analysis
-        text = create_searchable_text(file)
+    invalidate_search_results(project_id)
+    return indexed
+
+def iter_chunks(analyzed_files: Iterable[Dict], project_root: Optional[Path] = None) -> Iterator[Dict]:
+    """Yield the chunks of each file in turn (each source file is read once)"""
+    
+    for file in analyzed_files:
+        lines = read_source_lines(project_root, file['file_path']) if project_root else []
+        
+        yield make_chunk(file, "file", file['file_name'], None, 1, len(lines) or None, create_searchable_text(file), [])
         
-        documents.append(text)
-        metadatas.append({
+        for cls in file.get('classes', []):
+            start, end = symbol_lines(cls)
+            # The class chunk covers its header (up to the first method); methods get their own
+            header_end = min([m['line_number'] - 1 for m in cls.get('methods', []) if m.get('line_number')] + [end])
+            yield make_chunk(file, "class", cls['name'], None, start, end, cls.get('docstring'), lines[start - 1:max(header_end, start)])
+            
+            for method in cls.get('methods', []):
+                start, end = symbol_lines(method)
+                yield make_chunk(file, "method", method['name'], cls['name'], start, end, method.get('docstring'), lines[start - 1:end])
+        
+        for func in file.get('functions', []):
+            start, end = symbol_lines(func)
+            yield make_chunk(file, "function", func['name'], None, start, end, func.get('docstring'), lines[start - 1:end])
+
+def make_chunk(
+    file: Dict,
+    kind: str,
+    name: str,
+    parent: Optional[str],
+    start_line: int,
+    end_line: Optional[int],
+    docstring: Optional[str],
+    source_lines: List[str]
+) -> Dict:
+    """One indexable chunk: text to embed, metadata and a stable id"""
+    
+    qualified_name = f"{parent}.{name}" if parent else name
+    end_line = end_line or start_line
+    
+    # File chunks are the file's summary (which starts with its name)
+    parts = [] if kind == "file" else [f"{kind.capitalize()} {qualified_name} in {file['file_path']}"]
+    if docstring:
+        parts.append(docstring)
+    if source_lines:
+        snippet = source_lines[:EMBEDDING_CHUNK_MAX_LINES]
+        if len(source_lines) > EMBEDDING_CHUNK_MAX_LINES:
+            snippet.append("...")
+        parts.append('\n'.join(snippet))
+    
+    return {
+        'id': f"{file['file_path']}:{start_line}:{kind}:{qualified_name}",
+        'document': '\n'.join(parts),
+        'metadata': {
             'file_path': file['file_path'],
             'file_name': file['file_name'],
-            'complexity': file['complexity']
-        })
-        ids.append(f"file_{idx}")
-    
-    collection.add(
-        documents=documents,
-        metadatas=metadatas,
-        ids=ids
-    )
+            'complexity': file['complexity'],
+            'kind': kind,
+            'name': qualified_name,
+            'start_line': start_line,
+            'end_line': end_line
+        }
+    }
+
+def symbol_lines(symbol: Dict) -> Tuple[int, int]:
+    """(first, last) line of a symbol; analyses without end_line cover the def line only"""
+    start = symbol.get('line_number') or 1
+    return start, symbol.get('end_line') or start
+
+def read_source_lines(project_root: Path, file_path: str) -> List[str]:
+    """Lines of a project file, or none if it can no longer be read"""
+    try:
+        with open(Path(project_root) / file_path, 'r', encoding='utf-8', errors='replace') as f:
+            return f.read().splitlines()
+    except OSError:
+        return []
+
+def batched(items: Iterable, size: int) -> Iterator[List]:
+    """Consecutive lists of up to `size` items"""
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+def delete_file_embeddings(project_id: str, file_paths: List[str]):
+    """Remove embeddings of the given files from a project's collection"""
+    
+    if not file_paths:
+        return
+    
+    collection = get_project_collection(project_id)
+    if collection is None:
+        return
+    
+    collection.delete(where={"file_path": {"$in": list(file_paths)}})
+    invalidate_search_results(project_id)
+
+def invalidate_search_results(project_id: str):
+    """Forget cached search results of a project (after its index or symbols changed)"""
+    
+    with _generations_lock:
+        _index_generations[project_id] = _index_generations.get(project_id, 0) + 1
+    _search_results.invalidate(lambda key: key[0] == project_id)
 
 def create_searchable_text(file: Dict) -> str:
     """Convert file analysis to searchable text"""
     parts = [f"File: {file['file_name']}"]
     
     for cls in file.get('classes', []):
-        parts.append(f"Class {cls['name']}: {cls.get('docstring', '')}")
+        parts.append(f"Class {cls['name']}: {cls.get('docstring') or ''}")
         for method in cls.get('methods', []):
-            parts.append(f"Method {method['name']}: {method.get('docstring', '')}")
+            parts.append(f"Method {method['name']}: {method.get('docstring') or ''}")
     
     for func in file.get('functions', []):
-        parts.append(f"Function {func['name']}: {func.get('docstring', '')}")
+        parts.append(f"Function {func['name']}: {func.get('docstring') or ''}")
     
     return '\n'.join(parts)
 
-def search_codebase(query: str, project_id: str, n_results: int = 5) -> List[Dict]:
-    """Search codebase for relevant information"""
+def search_codebase(query: str, project_id: str, n_results: int = 5) -> Dict:
+    """
+    Hybrid retrieval: BM25 over symbol names and docstrings (the SQLite FTS
+    index) fused with vector similarity by reciprocal rank. Identifier-shaped
+    queries ("save_to_db", "ResponseCache.get") are answered from the
+    lexical index alone when it has hits, without embedding the query.
+    Repeated questions are answered from a short-lived result cache that is
+    dropped when the project is re-analyzed or re-indexed.
+    Returns: Chroma-style results for one query: ids, documents, metadatas,
+    distances (None for chunks found only lexically); shared, don't mutate
+    """
     
-    collection = chroma_client.get_collection(
-        name=f"project_{project_id}",
-        embedding_function=embedding_func
-    )
+    with _generations_lock:
+        generation = _index_generations.get(project_id, 0)
+    # Case is kept: it decides whether a query is treated as an identifier
+    key = (project_id, generation, ' '.join(query.split()), n_results)
+    results = _search_results.get(key)
+    if results is None:
+        results = _search(query, project_id, n_results)
+        _search_results.set(key, results)
+    return results
+
+def _search(query: str, project_id: str, n_results: int) -> Dict:
+    """Uncached hybrid search (see search_codebase)"""
     
-    results = collection.query(
-        query_texts=[query],
-        n_results=n_results
-    )
+    collection = get_project_collection(project_id)
+    candidates = n_results * RETRIEVAL_CANDIDATES
+    
+    identifier = identifier_query(query)
+    if identifier:
+        lexical = lexical_search(project_id, identifier, candidates, exact=True)
+        if lexical:
+            return chunk_results(collection, [(chunk_id, None) for chunk_id in lexical][:n_results], lexical)
+    
+    lexical = lexical_search(project_id, query, candidates)
+    vector = {}
+    if collection is not None and collection.count():
+        results = collection.query(
+            query_embeddings=[embed_query(query)],
+            n_results=min(candidates, collection.count())
+        )
+        vector = dict(zip(results['ids'][0], results['distances'][0]))
+    
+    ranked = reciprocal_rank_fusion([list(lexical), list(vector)])[:n_results]
+    return chunk_results(collection, [(chunk_id, vector.get(chunk_id)) for chunk_id in ranked], lexical)
+
+def get_project_collection(project_id: str):
+    """
+    A project's collection (handles are kept open), or None if it was never
+    indexed or there is no vector store. Opened without an embedding function:
+    queries pass their own embedding, so the model is only loaded by
+    embed_query when a query embedding is not cached.
+    """
+    
+    collection = _collections.get(project_id)
+    if collection is None:
+        try:
+            collection = get_chroma_client().get_collection(
+                name=f"project_{project_id}",
+                embedding_function=None
+            )
+        except ValueError:
+            return None
+        except ImportError:
+            # Vector store not installed: search falls back to the lexical index
+            return None
+        _collections.set(project_id, collection)
+    return collection
+
+def embed_query(query: str) -> List[float]:
+    """Embedding of a search query, reused for repeated questions"""
+    
+    key = embedding_key(query)
+    vector = _query_embeddings.get(key)
+    if vector is None:
+        vector = get_embedding_function()([query])[0]
+        _query_embeddings.set(key, vector)
+    return vector
+
+def get_retrieval_caches() -> Dict[str, MemoryCache]:
+    """In-memory caches of the search path, by name"""
+    return {
+        "collections": _collections,
+        "query_embeddings": _query_embeddings,
+        "search_results": _search_results
+    }
+
+def identifier_query(query: str) -> Optional[str]:
+    """The identifier a query consists of ("save_to_db()", "Cache.get"), or None for prose"""
+    
+    query = query.strip().strip('`').removesuffix('()')
+    if not IDENTIFIER_PATTERN.fullmatch(query):
+        return None
+    # A lone lowercase word is as likely prose as code; require code-like shape
+    if '_' in query or '.' in query or query != query.lower():
+        return query
+    return None
+
+def lexical_search(project_id: str, query: str, limit: int, exact: bool = False) -> Dict[str, Dict]:
+    """
+    Symbols matching `query` by BM25 as {chunk id: symbol}, best first. With
+    `exact`, `query` is one (possibly dotted) identifier: its last part must
+    match, and a qualifier ("Cache" in "Cache.get", which may also be a
+    module name) only ranks methods of that class first; otherwise any
+    non-stopword may match.
+    """
+    
+    if exact:
+        parent, _, name = query.rpartition('.')
+        symbols = search_symbols(project_id, name, limit=limit)
+        if parent:
+            # Methods of the named class first
+            symbols.sort(key=lambda symbol: symbol['parent'] != parent.rsplit('.', 1)[-1])
+    else:
+        terms = [term for term in re.findall(r'\w+', query) if term.lower() not in STOPWORDS]
+        if not terms:
+            return {}
+        symbols = search_symbols(project_id, ' '.join(terms), limit=limit, match_any=True)
+    
+    return {symbol_chunk_id(symbol): symbol for symbol in symbols}
+
+def symbol_chunk_id(symbol: Dict) -> str:
+    """Id of the chunk create_embeddings indexed for a symbols-table row"""
+    qualified_name = f"{symbol['parent']}.{symbol['name']}" if symbol['parent'] else symbol['name']
+    return f"{symbol['file_path']}:{symbol['line']}:{symbol['kind']}:{qualified_name}"
+
+def reciprocal_rank_fusion(rankings: List[List[str]]) -> List[str]:
+    """Merge rankings by summed 1 / (k + rank); items ranked well by several lists win"""
+    
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (RETRIEVAL_RRF_K + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+def chunk_results(collection, ranked: List[Tuple[str, Optional[float]]], lexical: Dict[str, Dict]) -> Dict:
+    """
+    Chroma-style results for ranked chunk ids. Chunks come from the collection;
+    symbols it lacks (e.g. project not re-indexed since chunking) are
+    described from the symbols table instead.
+    """
+    
+    ids = [chunk_id for chunk_id, _ in ranked]
+    stored = {}
+    if collection is not None and ids:
+        found = collection.get(ids=ids, include=["documents", "metadatas"])
+        stored = {
+            chunk_id: (document, metadata)
+            for chunk_id, document, metadata in zip(found['ids'], found['documents'], found['metadatas'])
+        }
+    
+    kept, documents, metadatas, distances = [], [], [], []
+    for chunk_id, distance in ranked:
+        if chunk_id in stored:
+            document, metadata = stored[chunk_id]
+        elif chunk_id in lexical:
+            document, metadata = symbol_chunk(lexical[chunk_id])
+        else:
+            # Vector hit deleted since the query (e.g. a file being re-indexed)
+            continue
+        kept.append(chunk_id)
+        documents.append(document)
+        metadatas.append(metadata)
+        distances.append(distance)
+    
+    return {
+        'ids': [kept],
+        'documents': [documents],
+        'metadatas': [metadatas],
+        'distances': [distances]
+    }
+
+def symbol_chunk(symbol: Dict) -> Tuple[str, Dict]:
+    """Document and metadata for a symbol, without its source snippet"""
     
-    return results
\ No newline at end of file
+    file = {
+        'file_path': symbol['file_path'],
+        'file_name': PurePosixPath(symbol['file_path']).name,
+        'complexity': 0
+    }
+    chunk = make_chunk(file, symbol['kind'], symbol['name'], symbol['parent'], symbol['line'], None, symbol['docstring'], [])
+    return chunk['document'], chunk['metadata']
@@ -0,0 +1,115 @@
+import hashlib
+import os
+import subprocess
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Local clones kept between analyses so updates only fetch new commits
+MIRROR_DIR = Path(os.environ.get("REPO_MIRROR_DIR", "./data/mirrors"))
+
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def mirror_path(repo_url: str) -> Path:
+    """Directory holding the local mirror of a repository"""
+    digest = hashlib.sha256(repo_url.encode()).hexdigest()[:16]
+    return MIRROR_DIR / digest
+
+
+def mirror_lock(repo_url: str) -> threading.Lock:
+    """Lock serializing jobs that touch the same mirror's working tree"""
+    with _locks_guard:
+        return _locks.setdefault(repo_url, threading.Lock())
+
+
+def sync_mirror(repo_url: str, branch: str) -> Tuple[Path, str]:
+    """
+    Create or fast-forward the local mirror to the tip of `branch`
+    Returns: (mirror directory, HEAD commit sha)
+    """
+
+    if not valid_branch_name(branch):
+        raise ValueError(f"Invalid branch name: {branch!r}")
+
+    path = mirror_path(repo_url)
+
+    if not (path / ".git").exists():
+        print(f"📂 Creating mirror of {repo_url}")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Blobless clone: full history for diffs, file contents fetched on checkout
+        _git(None, "clone", "--filter=blob:none", "--single-branch",
+             "--branch", branch, "--", repo_url, str(path))
+    else:
+        print(f"📂 Fetching new commits for {repo_url}")
+        _git(path, "fetch", "--", "origin", branch)
+        _git(path, "reset", "--hard", "FETCH_HEAD")
+        _git(path, "clean", "-fdx")
+
+    return path, head_commit(path)
+
+
+def valid_branch_name(branch: str) -> bool:
+    """Whether `branch` is a well-formed branch name (so it can't be read as a git option)"""
+    if not branch or branch.startswith('-'):
+        return False
+    try:
+        _git(None, "check-ref-format", f"refs/heads/{branch}")
+    except subprocess.CalledProcessError:
+        return False
+    return True
+
+
+def head_commit(repo_dir: Path) -> str:
+    """Commit sha checked out in `repo_dir`"""
+    return _git(repo_dir, "rev-parse", "HEAD").strip()
+
+
+def diff_commits(repo_dir: Path, old_sha: str, new_sha: str) -> Optional[Tuple[List[str], List[str]]]:
+    """
+    Files changed between two commits, as repo-relative POSIX paths
+    Returns: (added or modified, removed), or None if `old_sha` isn't in the mirror
+    """
+
+    try:
+        _git(repo_dir, "cat-file", "-e", f"{old_sha}^{{commit}}")
+    except subprocess.CalledProcessError:
+        return None
+
+    # Renames are reported as a removal plus an addition. -z and
+    # core.quotePath=false give raw paths (git otherwise C-quotes
+    # non-ASCII and special characters, e.g. "caf\303\251.py")
+    output = _git(
+        repo_dir, "-c", "core.quotePath=false",
+        "diff", "-z", "--name-status", "--no-renames", old_sha, new_sha
+    )
+    fields = output.split('\0')
+
+    changed, removed = [], []
+    for status, path in zip(fields[0::2], fields[1::2]):
+        if status == 'D':
+            removed.append(path)
+        elif path:
+            changed.append(path)
+
+    # A path that doesn't match the checked-out tree would leave its file's
+    # analysis stale; have the caller re-check every file instead
+    unmapped = [path for path in changed if not os.path.lexists(repo_dir / path)]
+    unmapped += [path for path in removed if os.path.lexists(repo_dir / path)]
+    if unmapped:
+        print(f"⚠️ {len(unmapped)} changed paths don't match the checkout (e.g. {unmapped[0]!r}), re-checking all files")
+        return None
+
+    return changed, removed
+
+
+def _git(cwd: Optional[Path], *args) -> str:
+    result = subprocess.run(
+        ["git", *args],
+        cwd=cwd,
+        check=True,
+        capture_output=True
+    )
+    # Undecodable bytes survive as surrogates, as in os.fsdecode paths
+    return result.stdout.decode('utf-8', errors='surrogateescape')
@@ -0,0 +1,268 @@
+import os
+import re
+import stat
+from pathlib import Path, PurePath, PurePosixPath
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+SUPPORTED_EXTENSIONS = {'.py', '.js', '.jsx', '.ts', '.tsx'}
+IGNORE_DIRS = {'node_modules', 'venv', '__pycache__', '.git', 'dist', 'build'}
+
+# Files larger than this are almost always generated/minified code
+MAX_FILE_SIZE_KB = int(os.environ.get("MAX_SCAN_FILE_KB", "1024"))
+
+# Stop scanning after this many files so a huge monorepo can't run away
+MAX_SCAN_FILES = int(os.environ.get("MAX_SCAN_FILES", "50000"))
+
+# (compiled pattern, negated, directory-only)
+Rule = Tuple[re.Pattern, bool, bool]
+
+# .gitignore rules in effect for a directory, outermost first
+RuleStack = List[Tuple[PurePath, List[Rule]]]
+
+GITIGNORE = '.gitignore'
+
+
+def walk_project_files(
+    project_path: Path,
+    max_file_size_kb: int = MAX_FILE_SIZE_KB,
+    max_files: int = MAX_SCAN_FILES
+) -> Iterator[Path]:
+    """
+    Lazily yield supported code files under `project_path`.
+    Ignored directories and .gitignore'd paths are pruned before descending,
+    so their contents are never listed.
+    """
+
+    project_path = Path(project_path)
+    max_bytes = max_file_size_kb * 1024
+    yielded = 0
+
+    # Depth-first; each entry carries the .gitignore rules of its parent directories
+    stack: List[Tuple[Path, RuleStack]] = [(project_path, [])]
+
+    while stack:
+        directory, rules = stack.pop()
+        rules = with_local_rules(directory, rules)
+
+        try:
+            entries = sorted(os.scandir(directory), key=lambda e: e.name)
+        except OSError:
+            continue
+
+        subdirs = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if not is_dir and not entry.is_file(follow_symlinks=False):
+                    continue
+            except OSError:
+                continue
+
+            path = Path(entry.path)
+
+            if is_dir:
+                if entry.name in IGNORE_DIRS or is_ignored(path, True, rules):
+                    continue
+                subdirs.append(path)
+                continue
+
+            if path.suffix not in SUPPORTED_EXTENSIONS or is_ignored(path, False, rules):
+                continue
+
+            try:
+                if is_too_large(path, entry.stat(follow_symlinks=False).st_size, max_bytes):
+                    continue
+            except OSError:
+                continue
+
+            yield path
+            yielded += 1
+            if yielded >= max_files:
+                print(f"⚠️ Stopped scanning after {max_files} files")
+                return
+
+        # Reversed so directories are visited in name order
+        for subdir in reversed(subdirs):
+            stack.append((subdir, rules))
+
+
+def filter_project_paths(
+    project_path: Path,
+    relative_paths: Iterable[str],
+    max_file_size_kb: int = MAX_FILE_SIZE_KB
+) -> List[str]:
+    """
+    The project-relative paths (e.g. from a git diff) that walk_project_files
+    would yield: supported, not .gitignore'd (directly or through a parent
+    directory) and within the size limit
+    """
+
+    project_path = Path(project_path)
+    max_bytes = max_file_size_kb * 1024
+    # Rules in effect inside each directory, shared by the paths below it
+    rules_by_dir: Dict[Path, RuleStack] = {}
+
+    def rules_in(directory: Path, parent_rules: RuleStack) -> RuleStack:
+        if directory not in rules_by_dir:
+            rules_by_dir[directory] = with_local_rules(directory, parent_rules)
+        return rules_by_dir[directory]
+
+    kept = []
+    for relative in relative_paths:
+        if not is_supported_path(relative):
+            continue
+
+        if is_ignored_path(project_path, relative, rules_in):
+            continue
+
+        path = project_path / relative
+
+        try:
+            info = path.lstat()
+        except OSError:
+            continue
+        if not stat.S_ISREG(info.st_mode) or is_too_large(path, info.st_size, max_bytes):
+            continue
+
+        kept.append(relative)
+
+    return kept
+
+
+def is_ignored_path(
+    root: PurePath,
+    relative: str,
+    rules_in: Callable[[PurePath, RuleStack], RuleStack]
+) -> bool:
+    """
+    Whether a root-relative file path is .gitignore'd, directly or through
+    one of its directories; `rules_in(directory, parent_rules)` gives the
+    rules in effect inside a directory (read from disk, a ZIP, ...)
+    """
+
+    directory = root
+    rules = rules_in(directory, [])
+    for part in PurePosixPath(relative).parts[:-1]:
+        directory = directory / part
+        if is_ignored(directory, True, rules):
+            return True
+        rules = rules_in(directory, rules)
+
+    return is_ignored(root / relative, False, rules)
+
+
+def is_too_large(path: Path, size: int, max_bytes: int) -> bool:
+    """Whether a file is over the scan size limit (logged when it is)"""
+
+    if size > max_bytes:
+        print(f"⚠️ Skipping large file: {path}")
+        return True
+    return False
+
+
+def is_supported_path(relative: str) -> bool:
+    """Whether a project-relative path has a supported extension outside ignored dirs"""
+    path = Path(relative)
+    return path.suffix in SUPPORTED_EXTENSIONS and not any(part in IGNORE_DIRS for part in path.parts)
+
+
+def load_gitignore(gitignore: Path) -> List[Rule]:
+    """Parse a .gitignore file into match rules (empty if missing)"""
+
+    try:
+        return parse_gitignore(gitignore.read_text(encoding='utf-8', errors='ignore'))
+    except OSError:
+        return []
+
+
+def parse_gitignore(text: str) -> List[Rule]:
+    """Parse .gitignore content into match rules"""
+
+    rules = []
+    for line in text.splitlines():
+        rule = _compile_rule(line)
+        if rule:
+            rules.append(rule)
+    return rules
+
+
+def with_local_rules(directory: Path, rules: RuleStack) -> RuleStack:
+    """`rules` extended with the directory's own .gitignore, if it has one"""
+
+    local_rules = load_gitignore(directory / GITIGNORE)
+    return rules + [(directory, local_rules)] if local_rules else rules
+
+
+def is_ignored(path: PurePath, is_dir: bool, rules: RuleStack) -> bool:
+    """Apply .gitignore rules from outermost to innermost; the last match wins"""
+
+    ignored = False
+    for base, base_rules in rules:
+        relative = path.relative_to(base).as_posix()
+        for pattern, negated, dir_only in base_rules:
+            if dir_only and not is_dir:
+                continue
+            if pattern.match(relative):
+                ignored = not negated
+    return ignored
+
+
+def _compile_rule(line: str) -> Optional[Rule]:
+    """Translate one .gitignore line into a regex over base-relative POSIX paths"""
+
+    line = line.rstrip()
+    if not line or line.startswith('#'):
+        return None
+
+    negated = line.startswith('!')
+    if negated:
+        line = line[1:]
+
+    dir_only = line.endswith('/')
+    line = line.rstrip('/')
+
+    # Patterns with a slash (other than a trailing one) are relative to the .gitignore's directory
+    anchored = '/' in line
+    line = line.lstrip('/')
+    if not line:
+        return None
+
+    regex = ''
+    i = 0
+    while i < len(line):
+        if line.startswith('**/', i):
+            regex += '(?:.*/)?'
+            i += 3
+        elif line.startswith('**', i):
+            regex += '.*'
+            i += 2
+        elif line[i] == '*':
+            regex += '[^/]*'
+            i += 1
+        elif line[i] == '?':
+            regex += '[^/]'
+            i += 1
+        elif line[i] == '[' and ']' in line[i + 1:]:
+            end = line.index(']', i + 1)
+            regex += _translate_class(line[i + 1:end])
+            i = end + 1
+        else:
+            regex += re.escape(line[i])
+            i += 1
+
+    prefix = '^' if anchored else '^(?:.*/)?'
+    return re.compile(prefix + regex + '$'), negated, dir_only
+
+
+def _translate_class(body: str) -> str:
+    """Regex for the inside of a [...] glob class; only a leading '!' negates"""
+
+    negated = body.startswith('!')
+    if negated:
+        body = body[1:]
+    if not body:
+        # "[]" / "[!]" match nothing in git; keep them literal rather than an invalid regex
+        return re.escape('[' + ('!' if negated else '') + ']')
+    # Ranges keep their '-'; characters special inside a regex class are literal
+    body = re.sub(r'([\\^\[\]])', r'\\\1', body)
+    return '[' + ('^' if negated else '') + body + ']'
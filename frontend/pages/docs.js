@@ -6,7 +6,7 @@ export default function Docs() {
   const { project_id } = router.query;
 
   const [project, setProject] = useState(null);
-  const [documentation, setDocumentation] = useState('');
+  const [sections, setSections] = useState([]);
   const [files, setFiles] = useState([]);
   const [ktPlan, setKtPlan] = useState(null);
   const [loading, setLoading] = useState(true);
@@ -24,19 +24,69 @@ export default function Docs() {
 
   const fetchProjectData = async () => {
     try {
+      // Outline first, so headings show before any section content arrives
       const response = await fetch(`http://localhost:8000/api/docs/${project_id}`);
       const data = await response.json();
 
       setProject(data.project);
-      setDocumentation(data.documentation);
-      setFiles(data.files);
+      setSections(data.sections || []);
       setLoading(false);
+
+      await streamSections();
+      fetchFiles();
     } catch (error) {
       console.error('Error fetching project data:', error);
       setLoading(false);
     }
   };
 
+  // Sections arrive one JSON object per line; render each as soon as it lands
+  const streamSections = async () => {
+    const response = await fetch(`http://localhost:8000/api/docs/${project_id}/stream`);
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = '';
+
+    const addSection = (line) => {
+      if (!line.trim()) return;
+      const section = JSON.parse(line);
+      setSections((current) => {
+        const rest = current.filter((s) => s.position !== section.position);
+        return [...rest, section].sort((a, b) => a.position - b.position);
+      });
+    };
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+
+      buffered += decoder.decode(value, { stream: true });
+      const lines = buffered.split('\n');
+      buffered = lines.pop();
+      lines.forEach(addSection);
+    }
+    addSection(buffered);
+  };
+
+  // Only the columns the file list renders, one page at a time
+  const fetchFiles = async () => {
+    try {
+      const fields = 'file_path,file_name,complexity,class_names,function_names';
+      let cursor = null;
+      setFiles([]);
+
+      do {
+        const query = `fields=${fields}&limit=200${cursor ? `&cursor=${cursor}` : ''}`;
+        const response = await fetch(`http://localhost:8000/api/projects/${project_id}/files?${query}`);
+        const data = await response.json();
+        setFiles((current) => [...current, ...data.files]);
+        cursor = data.next_cursor;
+      } while (cursor);
+    } catch (error) {
+      console.error('Error fetching files:', error);
+    }
+  };
+
   const fetchKTPlan = async () => {
     try {
       const response = await fetch(`http://localhost:8000/api/kt/${project_id}`);
@@ -56,7 +106,36 @@ export default function Docs() {
     setChatLoading(true);
 
     // Add user question to chat
-    setChatHistory([...chatHistory, { type: 'question', text: question }]);
+    setChatHistory((current) => [...current, { type: 'question', text: question }]);
+
+    // The answer grows in the last chat entry as tokens arrive
+    const updateAnswer = (update) => {
+      setChatHistory((current) => {
+        const last = current[current.length - 1];
+        return [...current.slice(0, -1), { ...last, ...update(last) }];
+      });
+    };
+
+    // Server-sent events: "sources" once, then "token" deltas, then "done" or "error"
+    const handleEvent = (frame) => {
+      let event = 'message';
+      let data = '';
+      frame.split('\n').forEach((line) => {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        if (line.startsWith('data: ')) data += line.slice(6);
+      });
+      if (!data) return;
+      const payload = JSON.parse(data);
+
+      if (event === 'sources') {
+        setChatLoading(false);
+        setChatHistory((current) => [...current, { type: 'answer', text: '', sources: payload.sources }]);
+      } else if (event === 'token') {
+        updateAnswer((last) => ({ text: last.text + payload.text }));
+      } else if (event === 'error') {
+        setChatHistory((current) => [...current, { type: 'error', text: payload.detail || 'Failed to get answer' }]);
+      }
+    };
 
     try {
       const response = await fetch('http://localhost:8000/api/chat', {
@@ -64,21 +143,25 @@ export default function Docs() {
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ question, project_id })
       });
+      if (!response.ok) throw new Error(`HTTP ${response.status}`);
 
-      const data = await response.json();
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffered = '';
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
 
-      setChatHistory([
-        ...chatHistory,
-        { type: 'question', text: question },
-        { type: 'answer', text: data.answer, sources: data.sources }
-      ]);
+        buffered += decoder.decode(value, { stream: true });
+        const frames = buffered.split('\n\n');
+        buffered = frames.pop();
+        frames.forEach(handleEvent);
+      }
+      handleEvent(buffered);
     } catch (error) {
       console.error('Chat error:', error);
-      setChatHistory([
-        ...chatHistory,
-        { type: 'question', text: question },
-        { type: 'error', text: 'Failed to get answer' }
-      ]);
+      setChatHistory((current) => [...current, { type: 'error', text: 'Failed to get answer' }]);
     } finally {
       setChatLoading(false);
     }
@@ -152,7 +235,18 @@ export default function Docs() {
         {activeTab === 'docs' && (
           <div className="bg-white rounded-lg shadow p-8">
             <div className="prose max-w-none">
-              <div className="whitespace-pre-wrap">{documentation}</div>
+              {sections.map((section) => (
+                <div key={section.position} className="mb-6">
+                  {section.content !== undefined ? (
+                    <div className="whitespace-pre-wrap">{section.content}</div>
+                  ) : (
+                    <div>
+                      <h2 className="text-xl font-semibold text-gray-900">{section.title}</h2>
+                      <p className="text-sm text-gray-400 mt-2 animate-pulse">Loading section...</p>
+                    </div>
+                  )}
+                </div>
+              ))}
             </div>
 
             {files && files.length > 0 && (
@@ -164,8 +258,8 @@ export default function Docs() {
                       <p className="font-mono text-sm text-gray-900">{file.file_name}</p>
                       <p className="text-xs text-gray-500 mt-1">
                         Complexity: {file.complexity} •
-                        {file.classes && ` ${file.classes.length} classes`} •
-                        {file.functions && ` ${file.functions.length} functions`}
+                        {file.class_names && ` ${file.class_names.length} classes`} •
+                        {file.function_names && ` ${file.function_names.length} functions`}
                       </p>
                     </div>
                   ))}
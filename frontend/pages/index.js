@@ -9,6 +9,9 @@ export default function Home() {
   const [role, setRole] = useState('fullstack');
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
+  const [stage, setStage] = useState('');
+  const [filesAnalyzed, setFilesAnalyzed] = useState(0);
+  const [docPreview, setDocPreview] = useState('');
   const router = useRouter();
 
   const handleFileChange = (e) => {
@@ -23,9 +26,71 @@ export default function Home() {
 
   const API_URL = process.env.NEXT_PUBLIC_BACKEND_URL || 'http://localhost:8000';
 
+  const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+  // Poll the analysis job until it finishes, returns the final job state
+  const waitForJob = async (jobId) => {
+    while (true) {
+      const response = await fetch(`${API_URL}/api/jobs/${jobId}`);
+      const job = await response.json();
+
+      if (!response.ok) {
+        throw new Error(job.detail || 'Error fetching job status');
+      }
+
+      const running = Object.entries(job.stages).find(([, info]) => info.status === 'running');
+      setStage(running ? running[0] : '');
+
+      if (job.status === 'completed' || job.status === 'failed') {
+        return job;
+      }
+
+      await sleep(2000);
+    }
+  };
+
+  // Follow the job's server-sent events (stages, progress, streamed docs) until it finishes;
+  // falls back to polling if the event stream can't be opened
+  const watchJob = (jobId) => new Promise((resolve, reject) => {
+    if (typeof EventSource === 'undefined') {
+      waitForJob(jobId).then(resolve, reject);
+      return;
+    }
+
+    const events = new EventSource(`${API_URL}/api/jobs/${jobId}/events`);
+
+    events.addEventListener('stage', (e) => {
+      const data = JSON.parse(e.data);
+      if (data.status === 'running') setStage(data.stage);
+    });
+    events.addEventListener('progress', (e) => {
+      setFilesAnalyzed(JSON.parse(e.data).files_analyzed);
+    });
+    events.addEventListener('token', (e) => {
+      const { text } = JSON.parse(e.data);
+      setDocPreview((preview) => preview + text);
+    });
+    events.addEventListener('completed', (e) => {
+      events.close();
+      resolve({ status: 'completed', ...JSON.parse(e.data) });
+    });
+    events.addEventListener('failed', (e) => {
+      events.close();
+      resolve({ status: 'failed', ...JSON.parse(e.data) });
+    });
+    events.onerror = () => {
+      // The browser retries dropped connections itself (resuming via Last-Event-ID)
+      if (events.readyState === EventSource.CLOSED) {
+        waitForJob(jobId).then(resolve, reject);
+      }
+    };
+  });
+
   const handleAnalyze = async () => {
     setError('');
     setLoading(true);
+    setFilesAnalyzed(0);
+    setDocPreview('');
 
     try {
       let response;
@@ -66,15 +131,23 @@ export default function Home() {
 
       const data = await response.json();
 
-      if (response.ok) {
-        router.push(`/docs?project_id=${data.project_id}`);
-      } else {
+      if (!response.ok) {
         setError(data.detail || 'Error analyzing project');
+        return;
+      }
+
+      const job = await watchJob(data.job_id);
+
+      if (job.status === 'completed') {
+        router.push(`/docs?project_id=${job.project_id}`);
+      } else {
+        setError(job.error || 'Error analyzing project');
       }
     } catch (err) {
       setError('Failed to connect to server. Make sure backend is running.');
     } finally {
       setLoading(false);
+      setStage('');
     }
   };
 
@@ -243,13 +316,21 @@ export default function Home() {
                   <circle className="opacity-25" cx="12" cy="12" r="10" stroke="currentColor" strokeWidth="4" fill="none" />
                   <path className="opacity-75" fill="currentColor" d="M4 12a8 8 0 018-8V0C5.373 0 0 5.373 0 12h4zm2 5.291A7.962 7.962 0 014 12H0c0 3.042 1.135 5.824 3 7.938l3-2.647z" />
                 </svg>
-                Analyzing...
+                {stage ? `Analyzing (${stage})...` : 'Analyzing...'}
+                {filesAnalyzed > 0 && ` ${filesAnalyzed} files`}
               </span>
             ) : (
               '🚀 Generate Documentation & KT Plan'
             )}
           </button>
 
+          {/* Documentation streamed while it is being generated */}
+          {loading && docPreview && (
+            <pre className="mt-6 p-4 max-h-64 overflow-y-auto bg-gray-50 border border-gray-200 rounded-lg text-sm text-gray-700 whitespace-pre-wrap">
+              {docPreview}
+            </pre>
+          )}
+
           {/* Features List */}
           <div className="mt-8 p-6 bg-gradient-to-r from-blue-50 to-indigo-50 rounded-lg">
             <h3 className="font-semibold text-gray-800 mb-3">✨ What you'll get:</h3>